@@ -0,0 +1,142 @@
+"""baseline schema (v0.4.0)
+
+Creates the v0.4.0 tables when they are missing. Databases that were
+bootstrapped by `init_db()` already have them and are left untouched.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2025-11-24
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_baseline'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+priority = sa.Enum("red", "amber", "green", name="priority")
+status = sa.Enum("new", "in_progress", "awaiting_parts", "blocked", "done", "cancelled", name="status")
+movementreason = sa.Enum("usage", "delivery", "adjustment", "transfer", name="movementreason")
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    str_ = sqlmodel.sql.sqltypes.AutoString()
+
+    if "site" not in existing:
+        op.create_table(
+            "site",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", str_, nullable=False),
+            sa.Column("address", str_, nullable=True),
+            sa.Column("notes", str_, nullable=True),
+        )
+
+    if "unit" not in existing:
+        op.create_table(
+            "unit",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("site_id", sa.Integer(), sa.ForeignKey("site.id"), nullable=False),
+            sa.Column("name", str_, nullable=False),
+            sa.Column("floor", str_, nullable=True),
+            sa.Column("notes", str_, nullable=True),
+        )
+
+    if "task" not in existing:
+        op.create_table(
+            "task",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("site_id", sa.Integer(), sa.ForeignKey("site.id"), nullable=False),
+            sa.Column("unit_id", sa.Integer(), sa.ForeignKey("unit.id"), nullable=True),
+            sa.Column("title", str_, nullable=False),
+            sa.Column("description", str_, nullable=False),
+            sa.Column("priority", priority, nullable=False),
+            sa.Column("status", status, nullable=False),
+            sa.Column("assignee", str_, nullable=True),
+            sa.Column("due_at", sa.DateTime(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+            sa.Column("is_recurring", sa.Boolean(), nullable=False),
+            sa.Column("recurrence", str_, nullable=True),
+            sa.Column("recur_interval", sa.Integer(), nullable=True),
+            sa.Column("recur_dow", sa.Integer(), nullable=True),
+            sa.Column("recur_dom", sa.Integer(), nullable=True),
+            sa.Column("recur_until", sa.DateTime(), nullable=True),
+            sa.Column("last_scheduled_at", sa.DateTime(), nullable=True),
+        )
+
+    if "taskcomment" not in existing:
+        op.create_table(
+            "taskcomment",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("task_id", sa.Integer(), sa.ForeignKey("task.id"), nullable=False),
+            sa.Column("author", str_, nullable=True),
+            sa.Column("body", str_, nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+
+    if "taskattachment" not in existing:
+        op.create_table(
+            "taskattachment",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("task_id", sa.Integer(), sa.ForeignKey("task.id"), nullable=False),
+            sa.Column("filename", str_, nullable=False),
+            sa.Column("url", str_, nullable=False),
+            sa.Column("uploaded_at", sa.DateTime(), nullable=False),
+        )
+
+    if "inventoryitem" not in existing:
+        op.create_table(
+            "inventoryitem",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("sku", str_, nullable=False),
+            sa.Column("name", str_, nullable=False),
+            sa.Column("category", str_, nullable=True),
+            sa.Column("uom", str_, nullable=False),
+            sa.Column("notes", str_, nullable=True),
+            sa.Column("min_level_default", sa.Integer(), nullable=False),
+        )
+
+    if "inventorystock" not in existing:
+        op.create_table(
+            "inventorystock",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("site_id", sa.Integer(), sa.ForeignKey("site.id"), nullable=False),
+            sa.Column("item_id", sa.Integer(), sa.ForeignKey("inventoryitem.id"), nullable=False),
+            sa.Column("quantity", sa.Integer(), nullable=False),
+            sa.Column("min_level_override", sa.Integer(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+        )
+
+    if "stockmovement" not in existing:
+        op.create_table(
+            "stockmovement",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("stock_id", sa.Integer(), sa.ForeignKey("inventorystock.id"), nullable=False),
+            sa.Column("delta_qty", sa.Integer(), nullable=False),
+            sa.Column("reason", movementreason, nullable=False),
+            sa.Column("reference", str_, nullable=True),
+            sa.Column("author", str_, nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+
+
+def downgrade():
+    for name in (
+        "stockmovement",
+        "inventorystock",
+        "inventoryitem",
+        "taskattachment",
+        "taskcomment",
+        "task",
+        "unit",
+        "site",
+    ):
+        op.drop_table(name)
+    bind = op.get_bind()
+    for enum in (movementreason, status, priority):
+        enum.drop(bind, checkfirst=True)
@@ -0,0 +1,26 @@
+"""full-text search index over task title/description
+
+SQLite: FTS5 table task_fts + sync triggers.
+Postgres: generated tsvector column + GIN index.
+
+Revision ID: 0002_task_search
+Revises: 0001_baseline
+Create Date: 2025-11-24
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.search import drop_search_index, install_search_index
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_task_search'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    install_search_index(op.get_bind())
+
+def downgrade():
+    drop_search_index(op.get_bind())
@@ -0,0 +1,40 @@
+"""indexes for the hot task query shapes
+
+Revision ID: 0003_task_indexes
+Revises: 0002_task_search
+Create Date: 2025-11-24
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_task_indexes'
+down_revision = '0002_task_search'
+branch_labels = None
+depends_on = None
+
+open_ = sa.column("status") != "done"
+template = sa.column("is_recurring") == sa.true()
+
+INDEXES = [
+    ("ix_task_site_status_due", ["site_id", "status", "due_at"], None),
+    ("ix_task_unit_due", ["unit_id", "due_at"], None),
+    ("ix_task_assignee_due", ["assignee", "due_at"], None),
+    ("ix_task_status_due", ["status", "due_at"], None),
+    ("ix_task_open_due", ["due_at"], open_),
+    ("ix_task_template_due", ["due_at"], template),
+]
+
+def upgrade():
+    for name, columns, where in INDEXES:
+        op.create_index(
+            name, "task", columns,
+            if_not_exists=True,
+            sqlite_where=where,
+            postgresql_where=where,
+        )
+
+def downgrade():
+    for name, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name="task", if_exists=True)
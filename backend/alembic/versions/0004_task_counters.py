@@ -0,0 +1,52 @@
+"""dashboard counters (taskcounter, taskcounterstate)
+
+The counters are built from the task table here, so every task write from
+then on finds the state row and keeps them current. (Databases migrated
+before this was done are seeded by init_db at startup.)
+
+Revision ID: 0004_task_counters
+Revises: 0003_task_indexes
+Create Date: 2025-11-25
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlmodel import Session
+
+from app.services import counters
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_task_counters'
+down_revision = '0003_task_indexes'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if "taskcounter" not in existing:
+        op.create_table(
+            "taskcounter",
+            sa.Column("site_id", sa.Integer(), nullable=False),
+            sa.Column(
+                "status",
+                sa.Enum("new", "in_progress", "awaiting_parts", "blocked", "done", "cancelled", name="status", create_type=False),
+                nullable=False,
+            ),
+            sa.Column("bucket", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column("count", sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint("site_id", "status", "bucket"),
+        )
+    if "taskcounterstate" not in existing:
+        op.create_table(
+            "taskcounterstate",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("as_of", sa.DateTime(), nullable=False),
+        )
+    with Session(bind=op.get_bind()) as session:
+        counters.seed(session)
+        session.flush()
+
+def downgrade():
+    op.drop_table("taskcounterstate")
+    op.drop_table("taskcounter")
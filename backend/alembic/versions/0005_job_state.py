@@ -0,0 +1,38 @@
+"""background job state (jobstate)
+
+Lease row + last-run stats for the periodic materialization scheduler.
+
+Revision ID: 0005_job_state
+Revises: 0004_task_counters
+Create Date: 2025-11-26
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_job_state'
+down_revision = '0004_task_counters'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    if "jobstate" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "jobstate",
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), primary_key=True),
+        sa.Column("holder", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("locked_until", sa.DateTime(), nullable=True),
+        sa.Column("last_started_at", sa.DateTime(), nullable=True),
+        sa.Column("last_finished_at", sa.DateTime(), nullable=True),
+        sa.Column("last_duration_ms", sa.Integer(), nullable=True),
+        sa.Column("last_created", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_skipped", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_expired", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_error", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    )
+
+def downgrade():
+    op.drop_table("jobstate")
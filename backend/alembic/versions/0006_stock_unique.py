@@ -0,0 +1,69 @@
+"""unique (site_id, item_id) on inventorystock
+
+Duplicate stock rows (from racing upserts) are merged first: the oldest row
+(lowest id) survives with the quantity and min-level override of the most
+recently updated duplicate, and movements of the others are re-pointed to it.
+
+Revision ID: 0006_stock_unique
+Revises: 0005_job_state
+Create Date: 2025-11-27
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_stock_unique'
+down_revision = '0005_job_state'
+branch_labels = None
+depends_on = None
+
+stock = sa.table(
+    "inventorystock",
+    sa.column("id", sa.Integer),
+    sa.column("site_id", sa.Integer),
+    sa.column("item_id", sa.Integer),
+    sa.column("quantity", sa.Integer),
+    sa.column("min_level_override", sa.Integer),
+    sa.column("updated_at", sa.DateTime),
+)
+movement = sa.table("stockmovement", sa.column("stock_id", sa.Integer))
+
+def merge_duplicates(conn) -> None:
+    dupes = conn.execute(
+        sa.select(stock.c.site_id, stock.c.item_id)
+        .group_by(stock.c.site_id, stock.c.item_id)
+        .having(sa.func.count() > 1)
+    ).all()
+    for site_id, item_id in dupes:
+        rows = conn.execute(
+            sa.select(stock)
+            .where(stock.c.site_id == site_id, stock.c.item_id == item_id)
+            .order_by(stock.c.id)
+        ).all()
+        keep, others = rows[0], rows[1:]
+        latest = max(rows, key=lambda r: (r.updated_at is not None, r.updated_at, r.id))
+        override = next(
+            (r.min_level_override for r in sorted(rows, key=lambda r: (r.updated_at is not None, r.updated_at, r.id), reverse=True)
+             if r.min_level_override is not None),
+            None,
+        )
+        other_ids = [r.id for r in others]
+        conn.execute(movement.update().where(movement.c.stock_id.in_(other_ids)).values(stock_id=keep.id))
+        conn.execute(stock.delete().where(stock.c.id.in_(other_ids)))
+        conn.execute(
+            stock.update()
+            .where(stock.c.id == keep.id)
+            .values(quantity=latest.quantity, min_level_override=override, updated_at=latest.updated_at)
+        )
+
+def upgrade():
+    merge_duplicates(op.get_bind())
+    op.create_index(
+        "uq_inventorystock_site_item", "inventorystock", ["site_id", "item_id"],
+        unique=True,
+        if_not_exists=True,
+    )
+
+def downgrade():
+    op.drop_index("uq_inventorystock_site_item", table_name="inventorystock", if_exists=True)
@@ -0,0 +1,24 @@
+"""covering index for the low-stock report
+
+Revision ID: 0007_stock_levels_index
+Revises: 0006_stock_unique
+Create Date: 2025-11-27
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_stock_levels_index'
+down_revision = '0006_stock_unique'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index(
+        "ix_inventorystock_site_levels", "inventorystock",
+        ["site_id", "item_id", "quantity", "min_level_override"],
+        if_not_exists=True,
+    )
+
+def downgrade():
+    op.drop_index("ix_inventorystock_site_levels", table_name="inventorystock", if_exists=True)
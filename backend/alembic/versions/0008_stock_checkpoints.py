@@ -0,0 +1,52 @@
+"""stock ledger checkpoints (stockcheckpoint)
+
+Every existing stock row gets a checkpoint at its current quantity, so the
+ledger starts out reconciled; point-in-time reads before the migration
+replay the raw movement history.
+
+Revision ID: 0008_stock_checkpoints
+Revises: 0007_stock_levels_index
+Create Date: 2025-11-28
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_stock_checkpoints'
+down_revision = '0007_stock_levels_index'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    bind = op.get_bind()
+    if "stockcheckpoint" not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            "stockcheckpoint",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("stock_id", sa.Integer(), sa.ForeignKey("inventorystock.id"), nullable=False),
+            sa.Column("as_of", sa.DateTime(), nullable=False),
+            sa.Column("quantity", sa.Integer(), nullable=False),
+        )
+        stock = sa.table("inventorystock", sa.column("id", sa.Integer), sa.column("quantity", sa.Integer))
+        checkpoint = sa.table(
+            "stockcheckpoint",
+            sa.column("stock_id", sa.Integer),
+            sa.column("as_of", sa.DateTime),
+            sa.column("quantity", sa.Integer),
+        )
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        bind.execute(
+            checkpoint.insert().from_select(
+                ["stock_id", "as_of", "quantity"],
+                sa.select(stock.c.id, sa.literal(now, sa.DateTime()), sa.func.coalesce(stock.c.quantity, 0)),
+            )
+        )
+    op.create_index("ix_stockcheckpoint_stock_asof", "stockcheckpoint", ["stock_id", "as_of"], if_not_exists=True)
+    op.create_index("ix_stockmovement_stock_created", "stockmovement", ["stock_id", "created_at"], if_not_exists=True)
+
+def downgrade():
+    op.drop_index("ix_stockmovement_stock_created", table_name="stockmovement", if_exists=True)
+    op.drop_table("stockcheckpoint")
@@ -0,0 +1,46 @@
+"""stock usage rollup (stockusagedaily, stockusagestate)
+
+The tables start empty; init_db rolls up the movement history at the next
+startup.
+
+Revision ID: 0009_stock_usage
+Revises: 0008_stock_checkpoints
+Create Date: 2025-11-28
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_stock_usage'
+down_revision = '0008_stock_checkpoints'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if "stockusagedaily" not in existing:
+        op.create_table(
+            "stockusagedaily",
+            sa.Column("stock_id", sa.Integer(), nullable=False),
+            sa.Column("day", sa.Date(), nullable=False),
+            sa.Column("used", sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint("stock_id", "day"),
+        )
+    if "stockusagestate" not in existing:
+        op.create_table(
+            "stockusagestate",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("as_of", sa.DateTime(), nullable=False),
+        )
+    op.create_index("ix_stockusagedaily_day", "stockusagedaily", ["day"], if_not_exists=True)
+    op.create_index(
+        "ix_stockmovement_reason_created", "stockmovement",
+        ["reason", "created_at", "stock_id", "delta_qty"],
+        if_not_exists=True,
+    )
+
+def downgrade():
+    op.drop_index("ix_stockmovement_reason_created", table_name="stockmovement", if_exists=True)
+    op.drop_table("stockusagestate")
+    op.drop_table("stockusagedaily")
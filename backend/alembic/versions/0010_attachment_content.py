@@ -0,0 +1,36 @@
+"""attachment content hash, size and type (taskattachment)
+
+Existing attachments keep their url and get NULLs; only new uploads are
+stored content-addressed.
+
+Revision ID: 0010_attachment_content
+Revises: 0009_stock_usage
+Create Date: 2025-11-29
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010_attachment_content'
+down_revision = '0009_stock_usage'
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    ("sha256", sa.String()),
+    ("size", sa.Integer()),
+    ("content_type", sa.String()),
+)
+
+def upgrade():
+    existing = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("taskattachment")}
+    with op.batch_alter_table("taskattachment") as batch:
+        for name, type_ in COLUMNS:
+            if name not in existing:
+                batch.add_column(sa.Column(name, type_, nullable=True))
+
+def downgrade():
+    with op.batch_alter_table("taskattachment") as batch:
+        for name, _ in reversed(COLUMNS):
+            batch.drop_column(name)
@@ -0,0 +1,28 @@
+"""attachment thumbnails (taskattachment.thumbnails)
+
+Existing attachments keep NULL (no previews); thumbnails are rendered for new
+uploads.
+
+Revision ID: 0011_attachment_thumbnails
+Revises: 0010_attachment_content
+Create Date: 2025-11-29
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011_attachment_thumbnails'
+down_revision = '0010_attachment_content'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    existing = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("taskattachment")}
+    if "thumbnails" not in existing:
+        with op.batch_alter_table("taskattachment") as batch:
+            batch.add_column(sa.Column("thumbnails", sa.JSON(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table("taskattachment") as batch:
+        batch.drop_column("thumbnails")
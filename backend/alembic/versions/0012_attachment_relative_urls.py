@@ -0,0 +1,38 @@
+"""relative attachment urls (taskattachment.url)
+
+Strips the scheme and host that uploads used to bake into the url
+("http://api.example/uploads/1_a.jpg" -> "/uploads/1_a.jpg").
+
+Revision ID: 0012_attachment_relative_urls
+Revises: 0011_attachment_thumbnails
+Create Date: 2025-11-30
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0012_attachment_relative_urls'
+down_revision = '0011_attachment_thumbnails'
+branch_labels = None
+depends_on = None
+
+attachment = sa.table("taskattachment", sa.column("id", sa.Integer), sa.column("url", sa.String))
+
+def upgrade():
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(attachment.c.id, attachment.c.url).where(
+            attachment.c.url.notlike("/%"), attachment.c.url.like("%/uploads/%")
+        )
+    ).all()
+    for id_, url in rows:
+        bind.execute(
+            attachment.update()
+            .where(attachment.c.id == id_)
+            .values(url=url[url.index("/uploads/"):])
+        )
+
+def downgrade():
+    # the original hosts are gone; relative urls keep working
+    pass
@@ -0,0 +1,22 @@
+"""task comment / attachment indexes
+
+Revision ID: 0013_task_io_indexes
+Revises: 0012_attachment_relative_urls
+Create Date: 2025-11-30
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0013_task_io_indexes'
+down_revision = '0012_attachment_relative_urls'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index("ix_taskcomment_task_created", "taskcomment", ["task_id", "created_at"], if_not_exists=True)
+    op.create_index("ix_taskattachment_task_uploaded", "taskattachment", ["task_id", "uploaded_at"], if_not_exists=True)
+
+def downgrade():
+    op.drop_index("ix_taskattachment_task_uploaded", table_name="taskattachment", if_exists=True)
+    op.drop_index("ix_taskcomment_task_created", table_name="taskcomment", if_exists=True)
@@ -0,0 +1,56 @@
+"""task change versions and delete tombstones (task.version, tasktombstone, changeversion)
+
+Existing tasks start at version 1 and the "task" counter at 1, so the first
+delta sync (no `since`) returns them and later ones only what changed after.
+
+Revision ID: 0014_task_versions
+Revises: 0013_task_io_indexes
+Create Date: 2025-12-01
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0014_task_versions'
+down_revision = '0013_task_io_indexes'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing = set(inspector.get_table_names())
+
+    if "version" not in {c["name"] for c in inspector.get_columns("task")}:
+        with op.batch_alter_table("task") as batch:
+            batch.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="0"))
+        op.execute("UPDATE task SET version = 1")
+    op.create_index("ix_task_version", "task", ["version"], if_not_exists=True)
+
+    if "tasktombstone" not in existing:
+        op.create_table(
+            "tasktombstone",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("task_id", sa.Integer(), nullable=False),
+            sa.Column("site_id", sa.Integer(), nullable=True),
+            sa.Column("version", sa.Integer(), nullable=False),
+            sa.Column("deleted_at", sa.DateTime(), nullable=False),
+        )
+    op.create_index("ix_tasktombstone_version", "tasktombstone", ["version"], if_not_exists=True)
+
+    if "changeversion" not in existing:
+        op.create_table(
+            "changeversion",
+            sa.Column("name", sa.String(), primary_key=True),
+            sa.Column("version", sa.Integer(), nullable=False),
+        )
+        op.execute("INSERT INTO changeversion (name, version) VALUES ('task', 1)")
+
+def downgrade():
+    op.drop_table("changeversion")
+    op.drop_index("ix_tasktombstone_version", table_name="tasktombstone", if_exists=True)
+    op.drop_table("tasktombstone")
+    op.drop_index("ix_task_version", table_name="task", if_exists=True)
+    with op.batch_alter_table("task") as batch:
+        batch.drop_column("version")
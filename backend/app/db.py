@@ -8,7 +8,29 @@ engine = create_engine(DB_URL, connect_args={"check_same_thread": False} if DB_U
 
 def init_db():
     from . import models # ensure models are imported
+    from .services.search import install_search_index
     SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        install_search_index(conn)
+    seed_state()
+
+
+def seed_state():
+    """Build the single-row rollups that were never built, before any request runs."""
+    from .services import counters, usage
+    with Session(engine) as session:
+        counters.seed(session)
+        usage.seed(session)
+        session.commit()
+
+
+def dialect_insert(session: Session, model):
+    """INSERT construct for the session's backend, so callers can use ON CONFLICT."""
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
 
 
 def get_session():
@@ -7,6 +7,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from .db import init_db
+from .services import events, scheduler, thumbnails
+from .services.uploads import UPLOAD_DIR, UploadFiles, UploadLimit
 from .routers.sites import router as sites_router
 from .routers.units import router as units_router
 from .routers.tasks import router as tasks_router
@@ -14,6 +16,7 @@ from .routers.inventory import router as inventory_router
 from .routers.task_io import router as task_io_router
 from .routers.summary import router as summary_router
 from .routers.maintenance import router as maintenance_router
+from .routers.events import router as events_router
 
 if os.getenv("ENV", "development") != "production":
     load_dotenv()
@@ -23,7 +26,14 @@ if os.getenv("ENV", "development") != "production":
 async def lifespan(app: FastAPI):
     # initialise DB on startup
     init_db()
+    # periodic background jobs: recurring-task materialization, stock ledger checkpoints
+    jobs = scheduler.start()
+    # change notifications for GET /api/events
+    events.start()
     yield
+    events.stop()
+    await scheduler.stop(jobs)
+    thumbnails.shutdown()
 
 
 app = FastAPI(
@@ -33,6 +43,10 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# attachment size limit, applied while the request body streams; added before
+# CORS so that CORS wraps it and its early 413 carries the CORS headers
+app.add_middleware(UploadLimit)
+
 # CORS – loosened for now, you can tighten later
 app.add_middleware(
     CORSMiddleware,
@@ -50,9 +64,10 @@ app.include_router(inventory_router, prefix="/api")
 app.include_router(task_io_router, prefix="/api")
 app.include_router(summary_router, prefix="/api")
 app.include_router(maintenance_router, prefix="/api")
+app.include_router(events_router, prefix="/api")
 
-# uploads for task attachments
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# uploads for task attachments (content-addressed files are cached as immutable)
+app.mount("/uploads", UploadFiles(directory=UPLOAD_DIR), name="uploads")
 
 # SPA mounting kept disabled for dev (Vite runs separately)
 # FRONTEND_DIR = os.path.join(os.path.dirname(__file__), ".", "frontend", "dist")
@@ -1,6 +1,7 @@
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import Optional
 from enum import Enum
+import sqlalchemy as sa
 from sqlmodel import SQLModel, Field
 
 class Priority(str, Enum):
@@ -35,7 +36,24 @@ class Unit(SQLModel, table=True):
     floor: Optional[str] = None
     notes: Optional[str] = None
 
+_task_open = sa.column("status") != "done"
+_task_template = sa.column("is_recurring") == sa.true()
+
 class Task(SQLModel, table=True):
+    __table_args__ = (
+        # list_tasks filters, each followed by the due_at sort
+        sa.Index("ix_task_site_status_due", "site_id", "status", "due_at"),
+        sa.Index("ix_task_unit_due", "unit_id", "due_at"),
+        sa.Index("ix_task_assignee_due", "assignee", "due_at"),
+        sa.Index("ix_task_status_due", "status", "due_at"),
+        # open tasks by due date: summary KPIs, overdue list/join
+        sa.Index("ix_task_open_due", "due_at", sqlite_where=_task_open, postgresql_where=_task_open),
+        # recurring templates by due date: maintenance scan
+        sa.Index("ix_task_template_due", "due_at", sqlite_where=_task_template, postgresql_where=_task_template),
+        # delta sync: tasks changed since a client's version
+        sa.Index("ix_task_version", "version"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     site_id: int = Field(foreign_key="site.id")
     unit_id: Optional[int] = Field(default=None, foreign_key="unit.id")
@@ -55,8 +73,53 @@ class Task(SQLModel, table=True):
     recur_dom: Optional[int] = None  # 1-31 (if you ever want monthly-on-day)
     recur_until: Optional[datetime] = None
     last_scheduled_at: Optional[datetime] = None
-    
+    version: int = 0  # ChangeVersion "task" at the task's last write, see services/versions.py
+
+class TaskCounter(SQLModel, table=True):
+    # dashboard counts maintained on every task write, see services/counters.py
+    site_id: int = Field(primary_key=True)
+    status: Status = Field(primary_key=True)
+    bucket: str = Field(primary_key=True)  # "none" | "overdue" | "overdue_today" | "today" | "week" | "later"
+    count: int = 0
+
+class TaskCounterState(SQLModel, table=True):
+    # single row: the moment TaskCounter due-date buckets were last computed for
+    id: Optional[int] = Field(default=None, primary_key=True)
+    as_of: datetime
+
+class ChangeVersion(SQLModel, table=True):
+    # one counter per kind of data, bumped once by every transaction that writes it
+    name: str = Field(primary_key=True)
+    version: int = 0
+
+class TaskTombstone(SQLModel, table=True):
+    # a deleted task, so delta clients (GET /api/tasks/changes) can drop it too
+    __table_args__ = (sa.Index("ix_tasktombstone_version", "version"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    task_id: int
+    site_id: Optional[int] = None
+    version: int
+    deleted_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class JobState(SQLModel, table=True):
+    # one row per background job: lease (used as the lock where there are no
+    # advisory locks) and the last run's stats, shared by every worker process
+    name: str = Field(primary_key=True)
+    holder: Optional[str] = None
+    locked_until: Optional[datetime] = None
+    last_started_at: Optional[datetime] = None
+    last_finished_at: Optional[datetime] = None
+    last_duration_ms: Optional[int] = None
+    last_created: int = 0
+    last_skipped: int = 0
+    last_expired: int = 0
+    last_error: Optional[str] = None
+
 class TaskComment(SQLModel, table=True):
+    # a task's comments, oldest first (task detail, /tasks/{id}/full paging)
+    __table_args__ = (sa.Index("ix_taskcomment_task_created", "task_id", "created_at"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     task_id: int = Field(foreign_key="task.id")
     author: Optional[str] = None
@@ -64,10 +127,17 @@ class TaskComment(SQLModel, table=True):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class TaskAttachment(SQLModel, table=True):
+    __table_args__ = (sa.Index("ix_taskattachment_task_uploaded", "task_id", "uploaded_at"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     task_id: int = Field(foreign_key="task.id")
     filename: str
-    url: str     # e.g. /uploads/123_photo.jpg
+    url: str     # relative, e.g. /uploads/ab/ab12…ef.jpg
+    sha256: Optional[str] = None  # content address; None for uploads stored before hashing
+    size: Optional[int] = None
+    content_type: Optional[str] = None
+    # {"160": "/uploads/ab/<sha>_160.webp", …}; NULL while pending, {} if not an image
+    thumbnails: Optional[dict] = Field(default=None, sa_column=sa.Column(sa.JSON))
     uploaded_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
@@ -81,6 +151,13 @@ class InventoryItem(SQLModel, table=True):
     min_level_default: int = 0
 
 class InventoryStock(SQLModel, table=True):
+    __table_args__ = (
+        # one stock row per item per site; upsert_stock relies on it for ON CONFLICT
+        sa.Index("uq_inventorystock_site_item", "site_id", "item_id", unique=True),
+        # covers the low-stock report: per-site scan + item join without touching the table
+        sa.Index("ix_inventorystock_site_levels", "site_id", "item_id", "quantity", "min_level_override"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     site_id: int = Field(foreign_key="site.id")
     item_id: int = Field(foreign_key="inventoryitem.id")
@@ -89,6 +166,13 @@ class InventoryStock(SQLModel, table=True):
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class StockMovement(SQLModel, table=True):
+    __table_args__ = (
+        # ledger replay: a stock row's movements after a checkpoint
+        sa.Index("ix_stockmovement_stock_created", "stock_id", "created_at"),
+        # usage rollup: covers the by-day aggregation of recent movements
+        sa.Index("ix_stockmovement_reason_created", "reason", "created_at", "stock_id", "delta_qty"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     stock_id: int = Field(foreign_key="inventorystock.id")
     delta_qty: int
@@ -96,3 +180,27 @@ class StockMovement(SQLModel, table=True):
     reference: Optional[str] = None
     author: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class StockCheckpoint(SQLModel, table=True):
+    # stock quantity as of a moment, so point-in-time reads replay only the
+    # movements after it; see services/ledger.py
+    __table_args__ = (sa.Index("ix_stockcheckpoint_stock_asof", "stock_id", "as_of"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    stock_id: int = Field(foreign_key="inventorystock.id")
+    as_of: datetime
+    quantity: int
+
+class StockUsageDaily(SQLModel, table=True):
+    # units used per stock row per day (usage movements), the cache behind the
+    # consumption-rate report; see services/usage.py
+    __table_args__ = (sa.Index("ix_stockusagedaily_day", "day"),)  # incremental refresh rewrites recent days
+
+    stock_id: int = Field(primary_key=True)
+    day: date = Field(primary_key=True)
+    used: int = 0
+
+class StockUsageState(SQLModel, table=True):
+    # single row: StockUsageDaily is complete for movements up to as_of
+    id: Optional[int] = Field(default=None, primary_key=True)
+    as_of: datetime
@@ -0,0 +1,62 @@
+import asyncio
+import json
+from typing import AsyncIterator, Optional, Set
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from ..services import events
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+TOPICS = ("task", "task_io", "inventory")
+
+
+async def _sse(request: Request, topics: Optional[Set[str]]) -> AsyncIterator[str]:
+    # subscribe inside the generator: its finally runs however the client goes away
+    sub = events.subscribe(topics)
+    try:
+        yield "retry: 5000\n\n"
+        while not sub.closed:
+            try:
+                event = await asyncio.wait_for(sub.queue.get(), events.KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if events.closing() or await request.is_disconnected():
+                    return
+                # keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+                continue
+            if event is None:  # events.close(): the server is shutting down
+                return
+            if sub.lagged:
+                # some events were dropped: the client should refetch instead of patching
+                sub.lagged = False
+                yield "event: lagged\ndata: {}\n\n"
+            yield f"event: {event['topic']}\ndata: {json.dumps(event, default=str)}\n\n"
+    finally:
+        events.unsubscribe(sub)
+
+
+@router.get("")
+def stream_events(
+    request: Request,
+    topics: Optional[str] = Query(None, description="comma-separated subset of: task, task_io, inventory"),
+) -> StreamingResponse:
+    """
+    Server-sent events for committed changes, e.g.
+    `event: task` / `data: {"topic": "task", "action": "updated", "ids": [12], "version": 345}`.
+    Events are notifications, not data: refetch (GET /api/tasks/changes?since=…)
+    on receipt. An `event: lagged` means some were dropped; resync fully. The
+    stream ends when the server shuts down; EventSource reconnects by itself.
+    """
+    wanted = None
+    if topics:
+        wanted = {t.strip() for t in topics.split(",") if t.strip()}
+        unknown = wanted - set(TOPICS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown topic(s): {', '.join(sorted(unknown))}")
+    return StreamingResponse(
+        _sse(request, wanted),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,15 +1,31 @@
 # app/routers/inventory.py
-from typing import List
+from datetime import datetime, timezone
+from typing import Any, Dict, List
 
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+import sqlalchemy as sa
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field
 from sqlmodel import Session, select
 
-from ..db import get_session
-from ..models import InventoryItem, InventoryStock, StockMovement, MovementReason
+from ..db import dialect_insert, get_session
+from ..models import InventoryItem, InventoryStock, Site, StockMovement, MovementReason
+from ..schemas import LowStockPage, LowStockRow, StockoutRow
+from ..services import events, ledger, usage, versions
+from ..services.pagination import decode_cursor, encode_cursor
+from ..services.stock import (
+    InsufficientStock,
+    StockNotFound,
+    apply_delta,
+    apply_deltas,
+    insert_movements,
+    lock_quantities,
+    transfer,
+)
 
 router = APIRouter(prefix="/inventory", tags=["inventory"])
 
+MAX_BATCH_MOVES = 5000
+
 
 class StockUpsertPayload(BaseModel):
     site_id: int
@@ -23,19 +39,43 @@ class StockMovePayload(BaseModel):
     reason: MovementReason = MovementReason.usage
     reference: str | None = None
     author: str | None = None
+    non_negative: bool = False  # reject the move if it would take quantity below zero
+
+
+class TransferPayload(BaseModel):
+    item_id: int
+    from_site_id: int
+    to_site_id: int
+    quantity: int = Field(..., gt=0)
+    reference: str | None = None  # shared by both movements; generated if omitted
+    author: str | None = None
+    non_negative: bool = True  # reject a transfer of more than the source holds
+
+
+class BatchMove(StockMovePayload):
+    stock_id: int
+
+
+class BatchMovePayload(BaseModel):
+    moves: List[BatchMove] = Field(..., max_length=MAX_BATCH_MOVES)
 
 
 # ----- Items -----
 @router.get("/items", response_model=List[InventoryItem])
-def list_items(session: Session = Depends(get_session)):
+def list_items(request: Request, response: Response, session: Session = Depends(get_session)):
+    cached = versions.not_modified(request, response, versions.etag(session, [versions.ITEM]))
+    if cached:
+        return cached
     return session.exec(select(InventoryItem).order_by(InventoryItem.name)).all()
 
 
 @router.post("/items", response_model=InventoryItem)
 def create_item(item: InventoryItem, session: Session = Depends(get_session)):
+    versions.bump(session, versions.ITEM)
     session.add(item)
     session.commit()
     session.refresh(item)
+    events.publish("inventory", kind="item", action="created", ids=[item.id])
     return item
 
 
@@ -52,9 +92,11 @@ def update_item(
     for k, v in data.model_dump(exclude_unset=True).items():
         setattr(it, k, v)
 
+    versions.bump(session, versions.ITEM)
     session.add(it)
     session.commit()
     session.refresh(it)
+    events.publish("inventory", kind="item", action="updated", ids=[item_id])
     return it
 
 
@@ -63,8 +105,10 @@ def delete_item(item_id: int, session: Session = Depends(get_session)):
     it = session.get(InventoryItem, item_id)
     if not it:
         raise HTTPException(404, "Item not found")
+    versions.bump(session, versions.ITEM)
     session.delete(it)
     session.commit()
+    events.publish("inventory", kind="item", action="deleted", ids=[item_id])
     return {"ok": True}
 
 
@@ -76,34 +120,124 @@ def list_stock(site_id: int, session: Session = Depends(get_session)):
     ).all()
 
 
+@router.get("/low-stock", response_model=LowStockPage)
+def low_stock(
+    site_id: int | None = Query(None),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = Query(None),
+    session: Session = Depends(get_session),
+):
+    """
+    Stock rows below their effective minimum (override, else the item default),
+    worst shortfall first. One join in the database, keyset-paged on (shortfall, id).
+    """
+    min_level = sa.func.coalesce(InventoryStock.min_level_override, InventoryItem.min_level_default)
+    quantity = sa.func.coalesce(InventoryStock.quantity, 0)
+    shortfall = (min_level - quantity).label("shortfall")
+
+    stmt = (
+        select(
+            InventoryStock.id,
+            InventoryStock.site_id,
+            Site.name,
+            InventoryStock.item_id,
+            InventoryItem.sku,
+            InventoryItem.name,
+            InventoryItem.uom,
+            quantity,
+            min_level,
+            shortfall,
+        )
+        .join(InventoryItem, InventoryItem.id == InventoryStock.item_id)
+        .join(Site, Site.id == InventoryStock.site_id, isouter=True)
+        .where(quantity < min_level)
+    )
+    if site_id is not None:
+        stmt = stmt.where(InventoryStock.site_id == site_id)
+    if cursor:
+        try:
+            pos = decode_cursor(cursor)
+            last_short, last_id = int(pos["k"]), int(pos["id"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(400, "Invalid cursor")
+        stmt = stmt.where(
+            sa.or_(min_level - quantity < last_short, sa.and_(min_level - quantity == last_short, InventoryStock.id > last_id))
+        )
+    stmt = stmt.order_by(shortfall.desc(), InventoryStock.id)
+
+    # fetch one extra row to know whether another page exists
+    rows = session.exec(stmt.limit(limit + 1)).all()
+    items = [
+        LowStockRow(
+            stock_id=r[0], site_id=r[1], site_name=r[2], item_id=r[3], sku=r[4], name=r[5], uom=r[6],
+            quantity=r[7], min_level=r[8], shortfall=r[9],
+        )
+        for r in rows[:limit]
+    ]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor({"k": items[-1].shortfall, "id": items[-1].stock_id})
+    return LowStockPage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/stockout-forecast", response_model=List[StockoutRow])
+def stockout_forecast(
+    site_id: int | None = Query(None),
+    window_days: int = Query(28, ge=1, le=365),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    session: Session = Depends(get_session),
+):
+    """
+    Usage rate over the trailing `window_days` and days until each stock row
+    reaches its effective min level at that rate, soonest first. Reads the
+    per-day usage rollup, refreshed incrementally when older than USAGE_ROLLUP_MAX_AGE.
+    """
+    usage.ensure_fresh(session)
+    today = datetime.now(timezone.utc).date()
+    rows = session.exec(usage.stockout_report(today, window_days, site_id).limit(limit).offset(offset)).all()
+    return [
+        StockoutRow(
+            stock_id=r[0], site_id=r[1], item_id=r[2], sku=r[3], name=r[4], quantity=r[5], min_level=r[6],
+            used=r[7], daily_rate=r[8], days_to_min_level=r[9],
+        )
+        for r in rows
+    ]
+
+
 @router.post("/stock/upsert", response_model=InventoryStock)
 def upsert_stock(payload: StockUpsertPayload, session: Session = Depends(get_session)):
-    row = session.exec(
-        select(InventoryStock).where(
-            (InventoryStock.site_id == payload.site_id)
-            & (InventoryStock.item_id == payload.item_id)
-        )
-    ).first()
-
-    if row:
-        row.quantity = payload.quantity
-        if payload.min_level_override is not None:
-            row.min_level_override = payload.min_level_override
-        session.add(row)
-        session.commit()
-        session.refresh(row)
-        return row
-
-    new_row = InventoryStock(
+    # one INSERT … ON CONFLICT DO UPDATE on the unique (site_id, item_id) index:
+    # a single round trip, and concurrent upserts cannot create duplicates
+    stmt = dialect_insert(session, InventoryStock).values(
         site_id=payload.site_id,
         item_id=payload.item_id,
         quantity=payload.quantity,
         min_level_override=payload.min_level_override,
+        updated_at=datetime.now(timezone.utc),
     )
-    session.add(new_row)
+    set_ = {"quantity": stmt.excluded.quantity, "updated_at": stmt.excluded.updated_at}
+    if payload.min_level_override is not None:
+        set_["min_level_override"] = stmt.excluded.min_level_override
+    stmt = stmt.on_conflict_do_update(index_elements=["site_id", "item_id"], set_=set_)
+
+    row = session.exec(stmt.returning(InventoryStock)).scalar_one()
+    # a quantity set outright is not a movement; pin the ledger to it
+    ledger.record_checkpoint(session, row.id, payload.quantity, row.updated_at)
     session.commit()
-    session.refresh(new_row)
-    return new_row
+    session.refresh(row)
+    events.publish("inventory", kind="stock", action="updated", ids=[row.id])
+    return row
+
+
+@router.get("/stock/{stock_id}/at")
+def stock_at(stock_id: int, ts: datetime, session: Session = Depends(get_session)) -> Dict[str, Any]:
+    """Quantity on hand at `ts`, from the nearest checkpoint plus the movements after it."""
+    if not session.get(InventoryStock, stock_id):
+        raise HTTPException(404, "Stock not found")
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ledger.quantity_at(session, stock_id, ts)
 
 
 @router.post("/stock/{stock_id}/move", response_model=StockMovement)
@@ -112,12 +246,14 @@ def move_stock(
     payload: StockMovePayload,
     session: Session = Depends(get_session),
 ):
-    st = session.get(InventoryStock, stock_id)
-    if not st:
+    # atomic increment; no read-modify-write, so concurrent moves are never lost
+    try:
+        quantity = apply_delta(session, stock_id, payload.delta, non_negative=payload.non_negative)
+    except InsufficientStock:
+        raise HTTPException(409, "Insufficient stock")
+    if quantity is None:
         raise HTTPException(404, "Stock not found")
 
-    st.quantity = (st.quantity or 0) + payload.delta
-
     mv = StockMovement(
         stock_id=stock_id,
         delta_qty=payload.delta,
@@ -126,8 +262,96 @@ def move_stock(
         author=payload.author,
     )
 
-    session.add(st)
     session.add(mv)
     session.commit()
     session.refresh(mv)
+    events.publish("inventory", kind="stock", action="moved", ids=[stock_id])
     return mv
+
+
+@router.post("/movements:batch")
+def move_stock_batch(payload: BatchMovePayload, session: Session = Depends(get_session)) -> Dict[str, Any]:
+    """
+    Apply many stock moves (a delivery, a stock-take) in one transaction:
+    one locking read, one executemany INSERT of the movements and one UPDATE
+    for all quantities. Moves are checked in order; a move on an unknown stock
+    row or one failing its non_negative guard is reported and skipped, the
+    rest are applied. The guards are enforced again inside the UPDATE (the
+    locking read does not lock on SQLite): if a concurrent change made one
+    fail there, nothing is applied and the response is 409.
+    """
+    quantities = lock_quantities(session, [m.stock_id for m in payload.moves])
+
+    results: List[Dict[str, Any]] = []
+    accepted: List[Dict[str, Any]] = []
+    deltas: Dict[int, int] = {}
+    # per stock row: the lowest running delta a non_negative move may leave,
+    # so the UPDATE can require quantity + floor >= 0 on the row as it is then
+    floors: Dict[int, int] = {}
+    for i, m in enumerate(payload.moves):
+        if m.stock_id not in quantities:
+            results.append({"index": i, "stock_id": m.stock_id, "ok": False, "error": "Stock not found"})
+            continue
+        if m.non_negative and quantities[m.stock_id] + m.delta < 0:
+            results.append({"index": i, "stock_id": m.stock_id, "ok": False, "error": "Insufficient stock"})
+            continue
+        quantities[m.stock_id] += m.delta
+        deltas[m.stock_id] = deltas.get(m.stock_id, 0) + m.delta
+        if m.non_negative:
+            floors[m.stock_id] = min(floors.get(m.stock_id, 0), deltas[m.stock_id])
+        results.append({"index": i, "stock_id": m.stock_id, "ok": True, "quantity": quantities[m.stock_id]})
+        accepted.append(
+            {"stock_id": m.stock_id, "delta_qty": m.delta, "reason": m.reason, "reference": m.reference, "author": m.author}
+        )
+
+    ids = iter(insert_movements(session, accepted))
+    for r in results:
+        if r["ok"]:
+            r["movement_id"] = next(ids)
+    try:
+        stock = apply_deltas(session, deltas, floors)
+    except InsufficientStock as exc:
+        session.rollback()
+        ids = ", ".join(map(str, exc.args))
+        raise HTTPException(409, f"Insufficient stock on {ids} (changed concurrently); nothing was applied")
+    session.commit()
+    if deltas:
+        events.publish("inventory", kind="stock", action="moved", ids=list(deltas))
+
+    return {"applied": len(accepted), "failed": len(results) - len(accepted), "results": results, "stock": stock}
+
+
+@router.post("/transfer")
+def transfer_stock(payload: TransferPayload, session: Session = Depends(get_session)) -> Dict[str, Any]:
+    """
+    Move stock between sites in one transaction: a debit at the source and a
+    credit at the destination (created if missing), linked by one reference.
+    """
+    if payload.from_site_id == payload.to_site_id:
+        raise HTTPException(400, "Source and destination site are the same")
+    # checked up front: the destination stock row is created inside transfer()
+    if not session.get(InventoryItem, payload.item_id):
+        raise HTTPException(404, "Item not found")
+    for site_id in (payload.from_site_id, payload.to_site_id):
+        if not session.get(Site, site_id):
+            raise HTTPException(404, "Site not found")
+    try:
+        result = transfer(
+            session,
+            payload.item_id,
+            payload.from_site_id,
+            payload.to_site_id,
+            payload.quantity,
+            reference=payload.reference,
+            author=payload.author,
+            non_negative=payload.non_negative,
+        )
+    except StockNotFound:
+        raise HTTPException(404, "Stock not found")
+    except InsufficientStock:
+        raise HTTPException(409, "Insufficient stock")
+    session.commit()
+    events.publish(
+        "inventory", kind="stock", action="moved", ids=[result["from"]["stock_id"], result["to"]["stock_id"]]
+    )
+    return result
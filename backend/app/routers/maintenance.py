@@ -1,18 +1,26 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import List, Dict, Any
+import json
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Iterator, Optional
 
 import sqlalchemy as sa
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
 
-from ..db import get_session
-from ..models import Task, Status, Priority
+from ..db import engine, get_session
+from ..models import Task
+from ..services import scheduler
+from ..services.forecast import forecast
+from ..services.materialize import BATCH_SIZE, due_templates
 from ..services.recurrence import next_due, within_until
 
 router = APIRouter(prefix="/maintenance", tags=["maintenance"])
 
+FORECAST_MAX_DAYS = 731
+FORECAST_CHUNK = 500  # rows per streamed chunk
+
 
 def _utc_now() -> datetime:
     return datetime.now(timezone.utc)
@@ -46,113 +54,97 @@ def preview_materialization(
     """
     now = _utc_now()
     bases: List[Task] = session.exec(
-        select(Task).where(
-            Task.is_recurring == True,
-            Task.recurrence.is_not(None),
-            Task.due_at.is_not(None),
-            Task.status != Status.done,
-        )
+        select(Task).where(*due_templates(now)).order_by(Task.due_at, Task.id)
     ).all()
 
     preview: List[Dict[str, Any]] = []
     for base in bases:
-        if base.last_scheduled_at and base.due_at and base.last_scheduled_at >= base.due_at:
-            continue
-
-        if base.due_at and base.due_at <= now:
-            nd = next_due(
-                due_at=base.due_at,
-                recurrence=base.recurrence,
-                recur_interval=base.recur_interval,
-                recur_dow=base.recur_dow,
-                recur_dom=base.recur_dom,
+        nd = next_due(
+            due_at=base.due_at,
+            recurrence=base.recurrence,
+            recur_interval=base.recur_interval,
+            recur_dow=base.recur_dow,
+            recur_dom=base.recur_dom,
+        )
+        if within_until(nd, base.recur_until):
+            preview.append(
+                {
+                    "template": _task_to_dict(base),
+                    "will_create": {
+                        "title": base.title,
+                        "site_id": base.site_id,
+                        "unit_id": base.unit_id,
+                        "priority": getattr(base.priority, "value", base.priority),
+                        "due_at": nd,
+                    },
+                    "will_advance_template_to": nd,
+                }
             )
-            if within_until(nd, base.recur_until):
-                preview.append(
-                    {
-                        "template": _task_to_dict(base),
-                        "will_create": {
-                            "title": base.title,
-                            "site_id": base.site_id,
-                            "unit_id": base.unit_id,
-                            "priority": getattr(base.priority, "value", base.priority),
-                            "due_at": nd,
-                        },
-                        "will_advance_template_to": nd,
-                    }
-                )
 
     return preview
 
 
+def _stream_forecast(start: datetime, end: datetime, site_id: Optional[int]) -> Iterator[str]:
+    # own session: the request-scoped one is not guaranteed to outlive the handler
+    with Session(engine) as session:
+        lines: List[str] = []
+        for row in forecast(session, start, end, site_id):
+            # rows are plain scalars; skip jsonable_encoder, it dominates at this volume
+            row["due_at"] = row["due_at"].isoformat()
+            lines.append(json.dumps(row) + "\n")
+            if len(lines) == FORECAST_CHUNK:
+                yield "".join(lines)
+                lines.clear()
+        if lines:
+            yield "".join(lines)
+
+
+@router.get("/forecast")
+def forecast_occurrences(
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = Query(None),
+    site_id: Optional[int] = Query(None),
+) -> StreamingResponse:
+    """
+    Every occurrence of every open recurring template in [from, to] (default: the
+    next 30 days), ordered by due_at, streamed as NDJSON. Occurrences are the ones
+    materialization would create, so the template's own current due_at is not included.
+    """
+    start = from_ or _utc_now()
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    end = to or start + timedelta(days=30)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if end - start > timedelta(days=FORECAST_MAX_DAYS):
+        raise HTTPException(status_code=400, detail=f"Forecast window is limited to {FORECAST_MAX_DAYS} days")
+    return StreamingResponse(_stream_forecast(start, end, site_id), media_type="application/x-ndjson")
+
+
 @router.post("/materialize")
 def materialize_recurring(
-    session: Session = Depends(get_session),
-    limit: int = Query(100, ge=1, le=1000),
+    limit: Optional[int] = Query(None, ge=1),
+    batch_size: int = Query(BATCH_SIZE, ge=1, le=10000),
+    catch_up: bool = Query(False),
 ) -> Dict[str, int]:
     """
     Create the next occurrence for each due recurring task and advance the template's due_at.
     Idempotent per-cycle using last_scheduled_at guard.
+    Works through the due templates in batches of `batch_size`, committing after each;
+    `limit` caps the number of occurrences created in this call.
+    With `catch_up`, a template that is several cycles behind gets every missed
+    occurrence in this one call instead of one per call.
+    Takes the same lock as the background scheduler; 409 while a run is in progress.
     """
-    now = _utc_now()
-    created = 0
-
-    bases: List[Task] = session.exec(
-        select(Task)
-        .where(
-            Task.is_recurring == True,
-            Task.recurrence.is_not(None),
-            Task.due_at.is_not(None),
-            Task.status != Status.done,
-        )
-        .order_by(Task.due_at.asc())
-    ).all()
-
-    for base in bases:
-        if created >= limit:
-            break
-
-        if base.last_scheduled_at and base.due_at and base.last_scheduled_at >= base.due_at:
-            continue
-
-        if base.due_at and base.due_at <= now:
-            nd = next_due(
-                due_at=base.due_at,
-                recurrence=base.recurrence,
-                recur_interval=base.recur_interval,
-                recur_dow=base.recur_dow,
-                recur_dom=base.recur_dom,
-            )
-            if not within_until(nd, base.recur_until):
-                base.last_scheduled_at = now
-                session.add(base)
-                continue
-
-            occ = Task(
-                site_id=base.site_id,
-                unit_id=base.unit_id,
-                title=base.title,
-                description=base.description,
-                priority=base.priority
-                if isinstance(base.priority, Priority)
-                else Priority.green,
-                status=Status.new,
-                assignee=base.assignee,
-                due_at=nd,
-                is_recurring=False,
-                recurrence=None,
-                recur_interval=None,
-                recur_dow=None,
-                recur_dom=None,
-                recur_until=None,
-                last_scheduled_at=None,
-            )
-            session.add(occ)
+    result = scheduler.run_once(_utc_now(), force=True, limit=limit, batch_size=batch_size, catch_up=catch_up)
+    if result is None:
+        raise HTTPException(status_code=409, detail="Materialization is already running")
+    return result
 
-            base.due_at = nd
-            base.last_scheduled_at = now
-            session.add(base)
-            created += 1
 
-    session.commit()
-    return {"created": created}
+@router.get("/scheduler")
+def scheduler_status() -> Dict[str, Any]:
+    """Background materialization settings and the last run's duration and counts."""
+    return scheduler.status()
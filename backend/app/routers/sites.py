@@ -1,17 +1,22 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from typing import List
 from sqlmodel import Session, select
 from ..db import get_session
 from ..models import Site, Unit
+from ..services import versions
 
 router = APIRouter(prefix="/sites", tags=["sites"])
 
 @router.get("", response_model=List[Site])
-def list_sites(session: Session = Depends(get_session)):
+def list_sites(request: Request, response: Response, session: Session = Depends(get_session)):
+    # 304 from the site version alone, before the list query
+    cached = versions.not_modified(request, response, versions.etag(session, [versions.SITE]))
+    if cached: return cached
     return session.exec(select(Site).order_by(Site.name)).all()
 
 @router.post("", response_model=Site)
 def create_site(site: Site, session: Session = Depends(get_session)):
+    versions.bump(session, versions.SITE)
     session.add(site); session.commit(); session.refresh(site); return site
 
 @router.put("/{site_id}", response_model=Site)
@@ -20,20 +25,25 @@ def update_site(site_id: int, data: Site, session: Session = Depends(get_session
     if not s: raise HTTPException(404, "Site not found")
     for k, v in data.model_dump(exclude_unset=True).items():
         setattr(s, k, v)
+    versions.bump(session, versions.SITE)
     session.add(s); session.commit(); session.refresh(s); return s
 
 @router.delete("/{site_id}")
 def delete_site(site_id: int, session: Session = Depends(get_session)):
     s = session.get(Site, site_id)
     if not s: raise HTTPException(404, "Site not found")
+    versions.bump(session, versions.SITE)
     session.delete(s); session.commit(); return {"ok": True}
 
 # Units
 @router.get("/{site_id}/units", response_model=List[Unit])
-def list_units(site_id: int, session: Session = Depends(get_session)):
+def list_units(site_id: int, request: Request, response: Response, session: Session = Depends(get_session)):
+    cached = versions.not_modified(request, response, versions.etag(session, [versions.UNIT], extra=site_id))
+    if cached: return cached
     return session.exec(select(Unit).where(Unit.site_id == site_id).order_by(Unit.name)).all()
 
 @router.post("/{site_id}/units", response_model=Unit)
 def create_unit(site_id: int, unit: Unit, session: Session = Depends(get_session)):
     u = Unit(site_id=site_id, name=unit.name, floor=unit.floor, notes=unit.notes)
+    versions.bump(session, versions.UNIT)
     session.add(u); session.commit(); session.refresh(u); return u
@@ -1,17 +1,23 @@
 from __future__ import annotations
 
+import os
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, List
 
 import sqlalchemy as sa
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from sqlmodel import Session, select
 
 from ..db import get_session
-from ..models import Site, Unit, Task, Status
+from ..models import Site, Unit, TaskCounter, Status
+from ..services import counters, versions
 
 router = APIRouter(prefix="/summary", tags=["summary"])
 
+# how stale the overdue / due-today buckets may get before a read ages them
+COUNTER_MAX_AGE_SECONDS = int(os.getenv("SUMMARY_COUNTER_MAX_AGE", "60"))
+
 def _count(session: Session, stmt) -> int:
     """Return an int count regardless of backend returning int or (int,) tuple."""
     res = session.exec(stmt)
@@ -24,66 +30,56 @@ def _count(session: Session, stmt) -> int:
     return int(v or 0)
 
 @router.get("")
-def get_summary(session: Session = Depends(get_session)) -> Dict[str, Any]:
-    now = datetime.now(timezone.utc)
-    today_start = datetime(now.year, now.month, now.day, tzinfo=timezone.utc)
-    week_end = today_start + timedelta(days=7)
+def get_summary(request: Request, response: Response, session: Session = Depends(get_session)) -> Dict[str, Any]:
+    # unchanged tasks, sites and units within one bucket-ageing period: same payload
+    period = int(time.time()) // max(COUNTER_MAX_AGE_SECONDS, 1)
+    tag = versions.etag(session, [versions.TASK, versions.SITE, versions.UNIT], extra=period)
+    cached = versions.not_modified(request, response, tag)
+    if cached:
+        return cached
+    return _build(session)
+
+
+def _build(session: Session) -> Dict[str, Any]:
+    """The summary payload. Reads the TaskCounter rows (O(sites)), not the task table."""
+    counters.ensure_fresh(session, timedelta(seconds=COUNTER_MAX_AGE_SECONDS))
 
-    sites = _count(session, select(sa.func.count(Site.id)))
+    site_names = dict(session.exec(select(Site.id, Site.name)).all())
     units = _count(session, select(sa.func.count(Unit.id)))
-    open_tasks = _count(session, select(sa.func.count(Task.id)).where(Task.status != Status.done))
-
-    overdue = _count(
-        session,
-        select(sa.func.count(Task.id)).where(
-            Task.status != Status.done,
-            Task.due_at.is_not(None),
-            Task.due_at < now,
-        ),
-    )
-
-    due_today = _count(
-        session,
-        select(sa.func.count(Task.id)).where(
-            Task.status != Status.done,
-            Task.due_at >= today_start,
-            Task.due_at < today_start + timedelta(days=1),
-        ),
-    )
-
-    due_week = _count(
-        session,
-        select(sa.func.count(Task.id)).where(
-            Task.status != Status.done,
-            Task.due_at >= today_start,
-            Task.due_at < week_end,
-        ),
-    )
-
-    by_status_rows = session.exec(
-        select(Task.status, sa.func.count(Task.id)).group_by(Task.status)
-    ).all()
 
-    done_value = getattr(Status.done, "value", Status.done)
-    by_site_rows = session.exec(
-        sa.text(
-            """
-            SELECT s.name AS site, COUNT(t.id) AS cnt
-            FROM task t
-            LEFT JOIN site s ON s.id = t.site_id
-            WHERE t.status != :done
-            GROUP BY s.name
-            ORDER BY cnt DESC
-            """
-        ).bindparams(done=done_value)
-    ).mappings().all()
+    open_tasks = overdue = due_today = due_week = 0
+    status_counts: Dict[str, int] = {}
+    site_counts: Dict[Any, int] = {}
 
-    by_status = [{"status": getattr(s, "value", s), "count": c} for (s, c) in by_status_rows]
-    by_site = [{"site": r["site"], "cnt": r["cnt"]} for r in by_site_rows]
+    rows = session.exec(
+        select(TaskCounter.site_id, TaskCounter.status, TaskCounter.bucket, TaskCounter.count).where(
+            TaskCounter.count != 0
+        )
+    ).all()
+    for site_id, status, bucket, cnt in rows:
+        status = getattr(status, "value", status)
+        status_counts[status] = status_counts.get(status, 0) + cnt
+        if status == Status.done.value:
+            continue
+        open_tasks += cnt
+        if bucket in ("overdue", "overdue_today"):
+            overdue += cnt
+        if bucket in ("overdue_today", "today"):
+            due_today += cnt
+        if bucket in ("overdue_today", "today", "week"):
+            due_week += cnt
+        site = site_names.get(site_id)
+        site_counts[site] = site_counts.get(site, 0) + cnt
+
+    by_status = [{"status": s, "count": c} for s, c in status_counts.items()]
+    by_site = [
+        {"site": site, "cnt": cnt}
+        for site, cnt in sorted(site_counts.items(), key=lambda kv: kv[1], reverse=True)
+    ]
 
     return {
         "kpis": {
-            "sites": sites,
+            "sites": len(site_names),
             "units": units,
             "open_tasks": open_tasks,
             "overdue": overdue,
@@ -1,9 +1,7 @@
-from pathlib import Path
 from typing import Optional
 
 from fastapi import (
     APIRouter,
-    Request,
     Depends,
     HTTPException,
     UploadFile,
@@ -15,27 +13,27 @@ from sqlmodel import Session, select
 
 from ..db import get_session
 from ..models import Task, TaskComment, TaskAttachment
+from ..services import events, thumbnails, uploads
 
 router = APIRouter(prefix="/tasks", tags=["task-io"])
 
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+uploads.UPLOAD_DIR.mkdir(exist_ok=True)
 
 
 # --- Comments ---
 
 @router.get("/{task_id}/comments")
 def list_comments(task_id: int, session: Session = Depends(get_session)):
-    task = session.get(Task, task_id)
-    if not task:
-        raise HTTPException(404, "Task not found")
-
     q = (
         select(TaskComment)
         .where(TaskComment.task_id == task_id)
         .order_by(TaskComment.created_at)
     )
-    return session.exec(q).all()
+    rows = session.exec(q).all()
+    # only an empty result needs the task looked up, to tell "none yet" from 404
+    if not rows and not session.get(Task, task_id):
+        raise HTTPException(404, "Task not found")
+    return rows
 
 
 @router.post("/{task_id}/comments")
@@ -53,6 +51,7 @@ def add_comment(
     session.add(c)
     session.commit()
     session.refresh(c)
+    events.publish("task_io", kind="comment", action="created", task_id=task_id, id=c.id)
     return c
 
 
@@ -79,6 +78,7 @@ def update_comment(
     session.add(c)
     session.commit()
     session.refresh(c)
+    events.publish("task_io", kind="comment", action="updated", task_id=task_id, id=comment_id)
     return c
 
 
@@ -94,6 +94,7 @@ def delete_comment(
 
     session.delete(c)
     session.commit()
+    events.publish("task_io", kind="comment", action="deleted", task_id=task_id, id=comment_id)
     # 204: no content
     return
 
@@ -104,40 +105,44 @@ def delete_comment(
 async def upload_attachment(
     task_id: int,
     file: UploadFile = File(...),
-    request: Request = None,  # FastAPI will always pass a Request
     session: Session = Depends(get_session),
 ):
     task = session.get(Task, task_id)
     if not task:
         raise HTTPException(404, "Task not found")
 
-    safe_name = f"{task_id}_{file.filename.replace('/', '_')}"
-    dest = UPLOAD_DIR / safe_name
-
-    contents = await file.read()
-    with dest.open("wb") as f:
-        f.write(contents)
-
-    base_url = str(request.base_url).rstrip("/") if request is not None else ""
-    public_path = f"/uploads/{safe_name}"
-    full_url = f"{base_url}{public_path}"
-
-    att = TaskAttachment(task_id=task_id, filename=file.filename, url=full_url)
+    # streamed to disk in chunks, stored once per content hash
+    try:
+        stored = await uploads.store(file)
+    except uploads.UploadTooLarge:
+        raise HTTPException(413, uploads.too_large_detail())
+
+    att = TaskAttachment(
+        task_id=task_id,
+        filename=file.filename,
+        url=uploads.public_url(stored.path),  # relative: survives host changes
+        sha256=stored.sha256,
+        size=stored.size,
+        content_type=file.content_type,
+    )
     session.add(att)
     session.commit()
     session.refresh(att)
+    # previews are rendered after the commit, off the request
+    thumbnails.schedule(att.id, stored.path)
+    events.publish("task_io", kind="attachment", action="created", task_id=task_id, id=att.id)
     return att
 
 
 @router.get("/{task_id}/attachments")
 def list_attachments(task_id: int, session: Session = Depends(get_session)):
-    task = session.get(Task, task_id)
-    if not task:
-        raise HTTPException(404, "Task not found")
-
     q = (
         select(TaskAttachment)
         .where(TaskAttachment.task_id == task_id)
         .order_by(TaskAttachment.uploaded_at)
     )
-    return session.exec(q).all()
+    rows = session.exec(q).all()
+    # only an empty result needs the task looked up, to tell "none yet" from 404
+    if not rows and not session.get(Task, task_id):
+        raise HTTPException(404, "Task not found")
+    return rows
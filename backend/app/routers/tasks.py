@@ -1,16 +1,107 @@
+import json
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import Annotated, Any, Dict, Iterator, List, Literal, Optional, Union
 
+import sqlalchemy as sa
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from sqlmodel import Session, select
 
-from ..db import get_session
-from ..models import Task, Status  # Task model with enums
+from ..db import engine, get_session
+from ..models import Site, Task, TaskAttachment, TaskComment, TaskTombstone, Status, Unit  # Task model with enums
+from ..schemas import TaskChanges, TaskCreate, TaskFull, TaskPage, TaskUpdate
+from ..services import counters, events, forecast, versions
+from ..services.pagination import decode_cursor, encode_cursor, parse_dt
+from ..services.search import apply_search, search_rank, search_words
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
 
-@router.get("", response_model=List[Task])
+SORT_COLUMNS = {"due_at": Task.due_at, "created_at": Task.created_at}
+STREAM_BATCH = 500
+MAX_BATCH_OPS = 1000
+NOT_NULL = ("site_id", "title", "description", "priority", "status")
+
+
+class BatchCreate(BaseModel):
+    op: Literal["create"]
+    task: TaskCreate
+
+
+class BatchUpdate(BaseModel):
+    op: Literal["update"]
+    id: int
+    patch: TaskUpdate  # only the fields sent are changed
+
+
+class BatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: int
+
+
+class TaskBatchPayload(BaseModel):
+    ops: List[Annotated[Union[BatchCreate, BatchUpdate, BatchDelete], Field(discriminator="op")]] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_OPS
+    )
+    atomic: bool = False  # all-or-nothing: any failed op rejects the whole batch (409)
+
+
+def _keyset_order(sort: str, key):
+    if sort == "due_at":
+        # due_at is nullable: undated tasks go last, ties broken by id
+        return [key.is_(None), key, Task.id]
+    return [key, Task.id]
+
+
+def _after_cursor(stmt, sort: str, key, cursor: str):
+    try:
+        pos = decode_cursor(cursor)
+        if pos.get("s") != sort:
+            raise ValueError("Cursor was issued for a different sort")
+        last_id = int(pos["id"])
+        last_key = float(pos["k"]) if sort == "relevance" else parse_dt(pos.get("k"))
+    except (KeyError, TypeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc) or "Invalid cursor")
+
+    if last_key is None:
+        return stmt.where(key.is_(None), Task.id > last_id)
+    after = [key > last_key, sa.and_(key == last_key, Task.id > last_id)]
+    if sort == "due_at":
+        after.append(key.is_(None))
+    return stmt.where(sa.or_(*after))
+
+
+def _child_page(session: Session, model, key, task_id: int, limit: int, cursor: Optional[str]) -> dict:
+    """One page of a task's comments or attachments, oldest first, keyset on (key, id)."""
+    stmt = select(model).where(model.task_id == task_id)
+    if cursor:
+        try:
+            pos = decode_cursor(cursor)
+            last_key, last_id = parse_dt(pos["k"]), int(pos["id"])
+        except (KeyError, TypeError, ValueError) as exc:
+            raise HTTPException(status_code=400, detail=str(exc) or "Invalid cursor")
+        stmt = stmt.where(sa.or_(key > last_key, sa.and_(key == last_key, model.id > last_id)))
+
+    rows = session.exec(stmt.order_by(key, model.id).limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor({"k": getattr(rows[-1], key.key), "id": rows[-1].id})
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+def _stream_tasks(stmt, ranked: bool) -> Iterator[str]:
+    # own session: the request-scoped one is not guaranteed to outlive the handler
+    with Session(engine) as session:
+        rows = session.exec(stmt.execution_options(yield_per=STREAM_BATCH))
+        for row in rows:
+            task = row[0] if ranked else row
+            yield json.dumps(jsonable_encoder(task)) + "\n"
+
+
+@router.get("", response_model=Union[List[Task], TaskPage])
 def list_tasks(
     session: Session = Depends(get_session),
     priority: Optional[str] = Query(None),
@@ -20,12 +111,35 @@ def list_tasks(
     unit_id: Optional[int] = Query(None),
     overdue: bool = Query(False),
     q: Optional[str] = Query(None),
-) -> List[Task]:
+    sort: Optional[Literal["due_at", "created_at", "relevance"]] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
+    stream: bool = Query(False),
+):
     """
     List tasks, with simple filters used by the Tasks page.
     All filters are optional.
+
+    `q` is a full-text search over title and description (every word,
+    prefix match); matches are ranked by relevance unless `sort` says otherwise.
+
+    Without `limit` the full list is returned (legacy behaviour). With `limit`
+    the response is a page `{items, next_cursor}` in keyset order on
+    (`sort`, id); pass `next_cursor` back as `cursor` to continue.
+    `stream=true` sends the matches as NDJSON straight off the DB cursor, in
+    the same order, starting after `cursor` and stopping after `limit` rows.
     """
-    stmt = select(Task)
+    dialect = session.get_bind().dialect.name
+    words = search_words(q)
+    rank = search_rank(dialect, words) if words else None
+
+    if sort is None or (sort == "relevance" and rank is None):
+        sort = "relevance" if rank is not None else "due_at"
+    key = rank if sort == "relevance" else SORT_COLUMNS[sort]
+
+    stmt = select(Task) if rank is None else select(Task, rank)
+    if words:
+        stmt = apply_search(stmt, dialect, words)
 
     if priority:
         stmt = stmt.where(Task.priority == priority)
@@ -51,30 +165,190 @@ def list_tasks(
             Task.status != Status.cancelled,
         )
 
-    tasks = session.exec(stmt).all()
+    if cursor:
+        stmt = _after_cursor(stmt, sort, key, cursor)
+    stmt = stmt.order_by(*_keyset_order(sort, key))
+
+    ranked = rank is not None
+    if stream:
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return StreamingResponse(_stream_tasks(stmt, ranked), media_type="application/x-ndjson")
 
-    # text search in Python – fine for small datasets
-    if q:
-        q_lower = q.lower()
-        tasks = [
-            t
-            for t in tasks
-            if (t.title and q_lower in t.title.lower())
-            or (getattr(t, "description", None) and q_lower in t.description.lower())
-        ]
+    if limit is None:
+        rows = session.exec(stmt).all()
+        return [r[0] for r in rows] if ranked else rows
 
-    return tasks
+    # fetch one extra row to know whether another page exists
+    rows = session.exec(stmt.limit(limit + 1)).all()
+    page = rows[:limit]
+    items = [r[0] for r in page] if ranked else page
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        if sort == "relevance":
+            last_key, last_id = last[1], last[0].id
+        else:
+            task = last[0] if ranked else last
+            last_key, last_id = getattr(task, sort), task.id
+        next_cursor = encode_cursor({"s": sort, "k": last_key, "id": last_id})
+    return TaskPage(items=items, next_cursor=next_cursor)
 
 
 @router.post("", response_model=Task, status_code=status.HTTP_201_CREATED)
 def create_task(task: Task, session: Session = Depends(get_session)) -> Task:
     """Create a new task."""
+    task.version = versions.bump(session, versions.TASK)
     session.add(task)
+    session.flush()
+    session.refresh(task)
+    counters.track(session, None, counters.snapshot(task))
     session.commit()
     session.refresh(task)
+    events.publish("task", action="created", ids=[task.id], version=task.version)
     return task
 
 
+@router.post(":batch")
+def batch_tasks(payload: TaskBatchPayload, session: Session = Depends(get_session)) -> Dict[str, Any]:
+    """
+    Apply many creates, partial updates and deletes in one transaction. Ops are
+    checked in order against the tasks as the batch leaves them (an update after
+    a delete of the same task fails); several updates of one task are merged.
+    Then: one DELETE … WHERE id IN, one UPDATE … WHERE id IN per distinct patch,
+    one executemany INSERT. Failed ops are reported and skipped, or with
+    `atomic` the batch is rejected with 409 and nothing is written.
+    """
+    now = datetime.now(timezone.utc)
+    ids = {op.id for op in payload.ops if op.op != "create"}
+    before: Dict[int, counters.Snapshot] = {}
+    if ids:
+        rows = session.exec(select(Task.id, Task.site_id, Task.status, Task.due_at).where(Task.id.in_(ids))).all()
+        before = {id_: (site_id, status, due_at) for id_, site_id, status, due_at in rows}
+    site_ids = {op.task.site_id for op in payload.ops if op.op == "create"}
+    site_ids |= {op.patch.site_id for op in payload.ops if op.op == "update" and op.patch.site_id is not None}
+    sites = set(session.exec(select(Site.id).where(Site.id.in_(site_ids))).all()) if site_ids else set()
+
+    results: List[Dict[str, Any]] = []
+    after: Dict[int, Optional[counters.Snapshot]] = dict(before)  # None once deleted
+    creates: List[Dict[str, Any]] = []
+    patches: Dict[int, Dict[str, Any]] = {}
+    deletes: List[int] = []
+    for i, op in enumerate(payload.ops):
+        error = None
+        if op.op == "create":
+            if op.task.site_id not in sites:
+                error = "Site not found"
+        elif after.get(op.id) is None:
+            error = "Task not found"
+        elif op.op == "update":
+            data = op.patch.model_dump(exclude_unset=True)
+            null = next((f for f in NOT_NULL if f in data and data[f] is None), None)
+            if null:
+                error = f"{null} cannot be null"
+            elif data.get("site_id") is not None and data["site_id"] not in sites:
+                error = "Site not found"
+        if error:
+            results.append({"index": i, "op": op.op, "id": getattr(op, "id", None), "ok": False, "error": error})
+            continue
+
+        if op.op == "create":
+            row = {**op.task.model_dump(), "created_at": now, "updated_at": now}
+            creates.append(row)
+            results.append({"index": i, "op": op.op, "id": None, "ok": True})
+        elif op.op == "update":
+            patches.setdefault(op.id, {}).update(data)
+            site_id, status, due_at = after[op.id]
+            after[op.id] = (data.get("site_id", site_id), data.get("status", status), data.get("due_at", due_at))
+            results.append({"index": i, "op": op.op, "id": op.id, "ok": True})
+        else:
+            after[op.id] = None
+            patches.pop(op.id, None)
+            deletes.append(op.id)
+            results.append({"index": i, "op": op.op, "id": op.id, "ok": True})
+
+    failed = sum(not r["ok"] for r in results)
+    if failed and payload.atomic:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": f"{failed} op(s) failed; nothing was applied", "results": results},
+        )
+
+    if failed == len(results):
+        return {"applied": 0, "failed": failed, "results": results}
+
+    version = versions.bump(session, versions.TASK)
+    if deletes:
+        session.exec(
+            sa.insert(TaskTombstone),
+            params=[
+                {"task_id": task_id, "site_id": before[task_id][0], "version": version, "deleted_at": now}
+                for task_id in deletes
+            ],
+        )
+        session.exec(sa.delete(Task).where(Task.id.in_(deletes)))
+    by_patch: Dict[tuple, List[int]] = {}
+    for task_id, patch in patches.items():
+        by_patch.setdefault(tuple(sorted(patch.items())), []).append(task_id)
+    for patch, task_ids in by_patch.items():
+        session.exec(
+            sa.update(Task).where(Task.id.in_(task_ids)).values(**dict(patch), updated_at=now, version=version)
+        )
+    if creates:
+        stmt = sa.insert(Task).returning(Task.id, sort_by_parameter_order=True)
+        params = [{**row, "version": version} for row in creates]
+        new_ids = iter(session.exec(stmt, params=params).scalars())
+        for r in results:
+            if r["ok"] and r["op"] == "create":
+                r["id"] = next(new_ids)
+
+    changes = [(before[task_id], after[task_id]) for task_id in before if before[task_id] != after[task_id]]
+    changes += [(None, (row["site_id"], row["status"], row["due_at"])) for row in creates]
+    counters.track_many(session, changes)
+    session.commit()
+    for task_id in {*patches, *deletes}:
+        forecast.invalidate(task_id)
+    for action, ids in (
+        ("created", [r["id"] for r in results if r["ok"] and r["op"] == "create"]),
+        ("updated", list(patches)),
+        ("deleted", deletes),
+    ):
+        if ids:
+            events.publish("task", action=action, ids=ids, version=version)
+
+    return {"applied": len(results) - failed, "failed": failed, "results": results}
+
+
+@router.get("/changes", response_model=TaskChanges)
+def task_changes(
+    since: Optional[int] = Query(None, ge=0, description="`version` from the previous response"),
+    session: Session = Depends(get_session),
+) -> dict:
+    """
+    Delta sync. Without `since`: every task, plus the current `version`. With
+    `since`: only the tasks written after that version and the ids deleted
+    since (an index range on task.version / tasktombstone.version). Pass the
+    returned `version` as `since` next time.
+    """
+    # read the version first: rows committed after it are left for the next call
+    version = versions.current(session, versions.TASK)
+    stmt = select(Task).where(Task.version <= version)
+    if since is not None:
+        stmt = stmt.where(Task.version > since)
+    tasks = session.exec(stmt.order_by(Task.version, Task.id)).all()
+
+    deleted: List[int] = []
+    if since is not None:
+        alive = {t.id for t in tasks}
+        gone = session.exec(
+            select(TaskTombstone.task_id)
+            .where(TaskTombstone.version > since, TaskTombstone.version <= version)
+            .order_by(TaskTombstone.version)
+        ).all()
+        deleted = [task_id for task_id in dict.fromkeys(gone) if task_id not in alive]
+    return {"version": version, "tasks": tasks, "deleted": deleted}
+
+
 @router.get("/{task_id}", response_model=Task)
 def get_task(task_id: int, session: Session = Depends(get_session)) -> Task:
     """Get a task by id."""
@@ -84,6 +358,38 @@ def get_task(task_id: int, session: Session = Depends(get_session)) -> Task:
     return task
 
 
+@router.get("/{task_id}/full", response_model=TaskFull)
+def get_task_full(
+    task_id: int,
+    limit: int = Query(20, ge=1, le=200, description="comments / attachments per page"),
+    comments_cursor: Optional[str] = None,
+    attachments_cursor: Optional[str] = None,
+    session: Session = Depends(get_session),
+) -> dict:
+    """
+    Everything the task detail page needs in three queries: the task with its
+    site and unit names, then one page each of comments and attachments.
+    """
+    row = session.exec(
+        select(Task, Site.name, Unit.name)
+        .join(Site, Site.id == Task.site_id, isouter=True)
+        .join(Unit, Unit.id == Task.unit_id, isouter=True)
+        .where(Task.id == task_id)
+    ).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Task not found")
+    task, site_name, unit_name = row
+    return {
+        "task": task,
+        "site_name": site_name,
+        "unit_name": unit_name,
+        "comments": _child_page(session, TaskComment, TaskComment.created_at, task_id, limit, comments_cursor),
+        "attachments": _child_page(
+            session, TaskAttachment, TaskAttachment.uploaded_at, task_id, limit, attachments_cursor
+        ),
+    }
+
+
 @router.patch("/{task_id}", response_model=Task)
 def update_task(
     task_id: int,
@@ -96,13 +402,21 @@ def update_task(
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
+    before = counters.snapshot(task)
     data = partial.model_dump(exclude_unset=True)
     for key, value in data.items():
         setattr(task, key, value)
+    task.updated_at = datetime.now(timezone.utc)
+    task.version = versions.bump(session, versions.TASK)
 
     session.add(task)
+    session.flush()
+    session.refresh(task)
+    counters.track(session, before, counters.snapshot(task))
     session.commit()
+    forecast.invalidate(task_id)
     session.refresh(task)
+    events.publish("task", action="updated", ids=[task_id], version=task.version)
     return task
 
 
@@ -111,5 +425,10 @@ def delete_task(task_id: int, session: Session = Depends(get_session)) -> None:
     task = session.get(Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
+    counters.track(session, counters.snapshot(task), None)
+    version = versions.bump(session, versions.TASK)
+    session.add(TaskTombstone(task_id=task.id, site_id=task.site_id, version=version))
     session.delete(task)
     session.commit()
+    forecast.invalidate(task_id)
+    events.publish("task", action="deleted", ids=[task_id], version=version)
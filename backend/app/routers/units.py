@@ -6,6 +6,7 @@ from sqlmodel import Session, select
 
 from ..db import get_session
 from ..models import Unit, Site
+from ..services import versions
 
 # No prefix here – we put /sites and /units directly on the routes
 router = APIRouter(prefix="", tags=["units"])
@@ -38,6 +39,7 @@ def create_unit_for_site(
         raise HTTPException(status_code=404, detail="Site not found")
 
     unit.site_id = site_id
+    versions.bump(session, versions.UNIT)
     session.add(unit)
     session.commit()
     session.refresh(unit)
@@ -65,6 +67,7 @@ def update_unit(
     for key, value in data.items():
         setattr(unit, key, value)
 
+    versions.bump(session, versions.UNIT)
     session.add(unit)
     session.commit()
     session.refresh(unit)
@@ -77,5 +80,6 @@ def delete_unit(unit_id: int, session: Session = Depends(get_session)) -> None:
     unit = session.get(Unit, unit_id)
     if not unit:
         raise HTTPException(status_code=404, detail="Unit not found")
+    versions.bump(session, versions.UNIT)
     session.delete(unit)
     session.commit()
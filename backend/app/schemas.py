@@ -1,9 +1,9 @@
 from datetime import datetime
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 from pydantic import BaseModel
 from datetime import datetime
 from sqlmodel import SQLModel
-from .models import Priority, Status
+from .models import Priority, Status, Task, TaskAttachment, TaskComment
 
 
 class SiteCreate(BaseModel):
@@ -45,6 +45,30 @@ class TaskUpdate(SQLModel):
     assignee: Optional[str] = None
     due_at: Optional[datetime] = None  # allow clearing with null
 
+class TaskPage(SQLModel):
+    items: List[Task]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next page
+
+class TaskChanges(SQLModel):
+    version: int  # pass back as ?since= on the next call
+    tasks: List[Task]  # created or updated since, oldest change first
+    deleted: List[int] = []  # ids of tasks deleted since
+
+class CommentPage(SQLModel):
+    items: List[TaskComment]
+    next_cursor: Optional[str] = None
+
+class AttachmentPage(SQLModel):
+    items: List[TaskAttachment]
+    next_cursor: Optional[str] = None
+
+class TaskFull(SQLModel):
+    task: Task
+    site_name: Optional[str] = None
+    unit_name: Optional[str] = None
+    comments: CommentPage
+    attachments: AttachmentPage
+
 class CommentCreate(SQLModel):
     author: Optional[str] = None
     body: str
@@ -69,6 +93,36 @@ class StockCreate(BaseModel):
     min_level_override: Optional[int] = None
 
 
+class LowStockRow(SQLModel):
+    stock_id: int
+    site_id: int
+    site_name: Optional[str] = None
+    item_id: int
+    sku: str
+    name: str
+    uom: str
+    quantity: int
+    min_level: int  # min_level_override, else the item's min_level_default
+    shortfall: int  # min_level - quantity, > 0
+
+class LowStockPage(SQLModel):
+    items: List[LowStockRow]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next page
+
+
+class StockoutRow(SQLModel):
+    stock_id: int
+    site_id: int
+    item_id: int
+    sku: str
+    name: str
+    quantity: int
+    min_level: int
+    used: int  # usage over the window
+    daily_rate: float
+    days_to_min_level: Optional[float] = None  # None: no usage in the window
+
+
 class MovementCreate(BaseModel):
     stock_id: int
     delta_qty: int
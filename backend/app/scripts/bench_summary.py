@@ -0,0 +1,134 @@
+"""
+Benchmark for /api/summary: the old eight-query version vs a single grouped
+pass over task vs the counter-table read the endpoint now does.
+Seeds a scratch SQLite database (never your real one) and times all three.
+
+    docker compose exec api python -m app.scripts.bench_summary --tasks 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import sqlalchemy as sa
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.models import Site, Status, Task, Unit
+from app.routers.summary import _build, _count
+from app.services import counters
+
+
+def legacy_summary(session: Session) -> dict:
+    """The pre-rollup implementation: one round trip (and one scan) per figure."""
+    now = datetime.now(timezone.utc)
+    today_start = datetime(now.year, now.month, now.day, tzinfo=timezone.utc)
+    week_end = today_start + timedelta(days=7)
+    open_ = Task.status != Status.done
+
+    kpis = {
+        "sites": _count(session, select(sa.func.count(Site.id))),
+        "units": _count(session, select(sa.func.count(Unit.id))),
+        "open_tasks": _count(session, select(sa.func.count(Task.id)).where(open_)),
+        "overdue": _count(
+            session, select(sa.func.count(Task.id)).where(open_, Task.due_at.is_not(None), Task.due_at < now)
+        ),
+        "due_today": _count(
+            session,
+            select(sa.func.count(Task.id)).where(
+                open_, Task.due_at >= today_start, Task.due_at < today_start + timedelta(days=1)
+            ),
+        ),
+        "due_this_week": _count(
+            session, select(sa.func.count(Task.id)).where(open_, Task.due_at >= today_start, Task.due_at < week_end)
+        ),
+    }
+    by_status = session.exec(select(Task.status, sa.func.count(Task.id)).group_by(Task.status)).all()
+    by_site = session.exec(
+        select(Site.name, sa.func.count(Task.id))
+        .select_from(Task)
+        .join(Site, Site.id == Task.site_id, isouter=True)
+        .where(open_)
+        .group_by(Site.name)
+    ).all()
+    return {"kpis": kpis, "by_status": by_status, "by_site": by_site}
+
+
+def seed(engine, n_tasks: int, n_sites: int) -> None:
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    statuses = [s.name for s in Status]
+    with engine.begin() as conn:
+        conn.execute(sa.insert(Site.__table__), [{"name": f"Site {i}"} for i in range(n_sites)])
+        conn.execute(
+            sa.insert(Unit.__table__),
+            [{"site_id": i % n_sites + 1, "name": f"Unit {i}"} for i in range(n_sites * 10)],
+        )
+        batch = []
+        for i in range(n_tasks):
+            due = now + timedelta(hours=random.randint(-24 * 60, 24 * 30)) if i % 5 else None
+            batch.append(
+                {
+                    "site_id": random.randint(1, n_sites),
+                    "title": f"Task {i}",
+                    "description": "",
+                    "priority": "green",
+                    "status": random.choice(statuses),
+                    "due_at": due,
+                    "created_at": now,
+                    "updated_at": now,
+                    "is_recurring": False,
+                }
+            )
+            if len(batch) == 50_000:
+                conn.execute(sa.insert(Task.__table__), batch)
+                batch.clear()
+        if batch:
+            conn.execute(sa.insert(Task.__table__), batch)
+
+
+def timed(fn, session: Session, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn(session)
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--sites", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+
+    print(f"Seeding {args.tasks:,} tasks across {args.sites} sites …")
+    seed(engine, args.tasks, args.sites)
+    with Session(engine) as session:
+        # raw inserts bypass the task write paths: build the counters once, as startup does
+        counters.seed(session)
+        session.commit()
+
+    with Session(engine) as session:
+        fast = _build(session)
+        slow = legacy_summary(session)
+        assert fast["kpis"] == slow["kpis"], (fast["kpis"], slow["kpis"])
+
+        legacy = timed(legacy_summary, session, args.runs)
+        rollup = timed(lambda s: counters.compute(s, datetime.now(timezone.utc)), session, args.runs)
+        counted = timed(_build, session, args.runs)
+
+    print(f"legacy (8 queries):  {legacy * 1000:8.1f} ms")
+    print(f"single-pass rollup:  {rollup * 1000:8.1f} ms  ({legacy / rollup:.1f}x)")
+    print(f"counter table read:  {counted * 1000:8.1f} ms  ({legacy / counted:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
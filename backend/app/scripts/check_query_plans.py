@@ -0,0 +1,106 @@
+"""
+Query-plan regression check for the hot Task query shapes.
+Asks the database for the plan of each query and fails if any of them
+falls back to a full scan of the task, comment or attachment table.
+
+    docker compose exec api python -m app.scripts.check_query_plans
+
+Exits with status 1 (and prints the offending plans) on regression.
+"""
+
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+import sqlalchemy as sa
+from sqlmodel import select
+
+from app.db import engine, init_db
+from app.models import Site, Status, Task, TaskAttachment, TaskComment, Unit
+
+TABLES = {"task", "taskcomment", "taskattachment"}
+
+
+def hot_queries() -> Dict[str, sa.Executable]:
+    now = datetime.now(timezone.utc)
+    today = datetime(now.year, now.month, now.day, tzinfo=timezone.utc)
+    open_ = Task.status != Status.done
+
+    return {
+        "tasks by site": select(Task).where(Task.site_id == 1).order_by(Task.due_at, Task.id),
+        "tasks by site+status": select(Task).where(Task.site_id == 1, Task.status == Status.new),
+        "tasks by unit": select(Task).where(Task.unit_id == 1).order_by(Task.due_at, Task.id),
+        "tasks by assignee": select(Task).where(Task.assignee == "sam"),
+        "tasks by status": select(Task).where(Task.status == Status.blocked),
+        "tasks overdue": select(Task).where(
+            Task.due_at.is_not(None),
+            Task.due_at < now,
+            open_,
+            Task.status != Status.cancelled,
+        ),
+        "summary overdue": select(sa.func.count(Task.id)).where(open_, Task.due_at.is_not(None), Task.due_at < now),
+        "summary due this week": select(sa.func.count(Task.id)).where(
+            open_, Task.due_at >= today, Task.due_at < today + timedelta(days=7)
+        ),
+        "summary overdue join": select(Task.id, Site.name, Unit.name)
+        .select_from(Task)
+        .join(Site, Site.id == Task.site_id, isouter=True)
+        .join(Unit, Unit.id == Task.unit_id, isouter=True)
+        .where(open_, Task.due_at.is_not(None), Task.due_at < now)
+        .order_by(Task.due_at),
+        "recurring templates": select(Task)
+        .where(
+            Task.is_recurring == True,
+            Task.recurrence.is_not(None),
+            Task.due_at.is_not(None),
+            open_,
+        )
+        .order_by(Task.due_at),
+        "task changes since": select(Task).where(Task.version > 100, Task.version <= 200).order_by(Task.version, Task.id),
+        "task comments": select(TaskComment)
+        .where(TaskComment.task_id == 1)
+        .order_by(TaskComment.created_at, TaskComment.id),
+        "task attachments": select(TaskAttachment)
+        .where(TaskAttachment.task_id == 1)
+        .order_by(TaskAttachment.uploaded_at, TaskAttachment.id),
+    }
+
+
+def full_scans(conn: sa.Connection, stmt: sa.Executable) -> List[str]:
+    """Return the plan lines that read a whole table in TABLES (empty list = OK)."""
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+
+    if conn.dialect.name == "sqlite":
+        plan = [r[-1] for r in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+        return [p for p in plan if (m := re.match(r"SCAN (\w+)", p)) and m[1] in TABLES and "INDEX" not in p]
+
+    if conn.dialect.name == "postgresql":
+        # tiny dev tables always win with a seq scan; ask what the planner does without one
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = [r[0] for r in conn.exec_driver_sql(f"EXPLAIN {sql}")]
+        return [p for p in plan if (m := re.search(r"Seq Scan on (\w+)", p)) and m[1] in TABLES]
+
+    raise SystemExit(f"Unsupported database: {conn.dialect.name}")
+
+
+def main() -> int:
+    init_db()
+    failed = 0
+    with engine.begin() as conn:
+        for name, stmt in hot_queries().items():
+            bad = full_scans(conn, stmt)
+            print(f"{'FULL SCAN' if bad else 'ok':>9}  {name}")
+            for line in bad:
+                print(f"           {line.strip()}")
+            failed += bool(bad)
+
+    if failed:
+        print(f"{failed} query shape(s) regressed to a full table scan ❌")
+        return 1
+    print("All hot query shapes use an index ✅")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Randomized check of the compiled recurrence rules against next_due.
+For random rules and anchors, stepping next_due k times must land on
+Rule.nth(k), Rule.count_until must match a step-by-step count, and
+Rule.between must list exactly the stepped dates inside the window.
+
+    docker compose exec api python -m app.scripts.check_recurrence --cases 5000
+
+Exits with status 1 (and prints the first failures) on any mismatch.
+"""
+
+import argparse
+import random
+import sys
+from calendar import monthrange
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from app.services.recurrence import compile_rule, next_due
+
+STEPS = 80
+
+
+def random_case(rnd: random.Random) -> tuple:
+    recurrence = rnd.choice(["daily", "weekly", "monthly", "quarterly", "yearly"])
+    interval = rnd.choice([None, 1, 2, 3, 5])
+    dow = rnd.choice([None, 0, 3, 6]) if recurrence == "weekly" else None
+    dom = rnd.choice([None, 1, 15, 28, 29, 30, 31]) if recurrence in ("monthly", "quarterly", "yearly") else None
+    y, m = rnd.randint(1999, 2030), rnd.randint(1, 12)
+    due_at = datetime(y, m, rnd.randint(1, monthrange(y, m)[1]), rnd.randint(0, 23), rnd.choice([0, 30]))
+    return recurrence, interval, dow, dom, due_at
+
+
+def check(rnd: random.Random) -> Optional[str]:
+    recurrence, interval, dow, dom, due_at = case = random_case(rnd)
+    rule = compile_rule(recurrence, interval, dow, dom)
+
+    stepped: List[datetime] = []
+    cur = due_at
+    for _ in range(STEPS):
+        cur = next_due(cur, recurrence, interval, dow, dom)
+        stepped.append(cur)
+
+    for k, expected in enumerate(stepped, start=1):
+        if rule.nth(due_at, k) != expected:
+            return f"nth({k}) = {rule.nth(due_at, k)}, next_due x{k} = {expected}  {case}"
+
+    until = due_at + timedelta(days=rnd.randint(0, (stepped[-1] - due_at).days))
+    expected_count = sum(d <= until for d in stepped)
+    if rule.count_until(due_at, until) != expected_count:
+        return f"count_until({until}) = {rule.count_until(due_at, until)}, expected {expected_count}  {case}"
+
+    start = due_at + timedelta(days=rnd.randint(0, (stepped[-1] - due_at).days))
+    end = start + timedelta(days=rnd.randint(0, 400))
+    if end <= stepped[-1]:
+        got = list(rule.between(due_at, start, end))
+        want = [d for d in stepped if start <= d <= end]
+        if got != want:
+            return f"between({start}, {end}) = {got[:3]}…, expected {want[:3]}…  {case}"
+    return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(1 << 30)
+    rnd = random.Random(seed)
+    failures = [f for f in (check(rnd) for _ in range(args.cases)) if f]
+
+    for f in failures[:10]:
+        print(f)
+    if failures:
+        print(f"{len(failures)} of {args.cases} cases disagree with next_due (seed {seed}) ❌")
+        return 1
+    print(f"{args.cases} random rules agree with next_due (seed {seed}) ✅")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
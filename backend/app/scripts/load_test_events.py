@@ -0,0 +1,130 @@
+"""
+Load test for GET /api/events. Starts its own API server on a scratch SQLite
+database (never your real one), measures the server's CPU while idle with no
+subscribers and then with N idle SSE subscribers, then fires task writes and
+checks that every subscriber received every event.
+
+    docker compose exec api python -m app.scripts.load_test_events --subscribers 500
+
+CPU is read from /proc/<pid>/stat, so this runs on Linux (the api container).
+Exits with status 1 if events went missing or idle subscribers cost more than
+--max-idle-cpu percent of one core.
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime, stime: fields 14 and 15 of the full line
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def idle_cpu(pid: int, seconds: float) -> float:
+    """Server CPU over `seconds`, as a percentage of one core."""
+    before = cpu_seconds(pid)
+    await asyncio.sleep(seconds)
+    return (cpu_seconds(pid) - before) / seconds * 100
+
+
+async def subscriber(client: httpx.AsyncClient, ready: asyncio.Event, counts: list, i: int, total: list) -> None:
+    async with client.stream("GET", "/api/events", params={"topics": "task"}) as response:
+        async for line in response.aiter_lines():
+            if line.startswith("retry:"):
+                total[0] += 1
+                if total[0] == len(counts):
+                    ready.set()
+            elif line.startswith("event: task"):
+                counts[i] += 1
+
+
+async def run(args: argparse.Namespace, base_url: str, pid: int) -> int:
+    limits = httpx.Limits(max_connections=args.subscribers + 10, max_keepalive_connections=args.subscribers + 10)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=httpx.Timeout(30, read=None)) as client:
+        site = (await client.post("/api/sites", json={"name": "load test"})).json()["id"]
+
+        baseline = await idle_cpu(pid, args.idle_seconds)
+        print(f"idle, no subscribers:        {baseline:6.2f}% of a core")
+
+        counts = [0] * args.subscribers
+        connected, ready = [0], asyncio.Event()
+        tasks = [
+            asyncio.create_task(subscriber(client, ready, counts, i, connected)) for i in range(args.subscribers)
+        ]
+        await asyncio.wait_for(ready.wait(), timeout=60)
+        await asyncio.sleep(1)  # let the connection burst settle
+
+        loaded = await idle_cpu(pid, args.idle_seconds)
+        print(f"idle, {args.subscribers} subscribers: {loaded:6.2f}% of a core")
+
+        started = time.perf_counter()
+        for n in range(args.events):
+            await client.post("/api/tasks", json={"site_id": site, "title": f"load test {n}", "description": ""})
+        expected = args.events
+        while min(counts) < expected and time.perf_counter() - started < 30:
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - started
+        delivered = sum(min(c, expected) for c in counts)
+        print(f"{args.events} writes -> {delivered}/{expected * args.subscribers} events delivered in {elapsed:.2f}s")
+
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    ok = delivered == expected * args.subscribers and loaded - baseline <= args.max_idle_cpu
+    print("Idle subscribers are cheap and every event arrived ✅" if ok else "Event fan-out check failed ❌")
+    return 0 if ok else 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--idle-seconds", type=float, default=10)
+    parser.add_argument("--max-idle-cpu", type=float, default=2.0, help="allowed extra idle CPU, percent of a core")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{tmp}/events.db",
+            "MATERIALIZE_INTERVAL_SECONDS": "0",
+            "STOCK_CHECKPOINT_INTERVAL_SECONDS": "0",
+            "ENV": "production",  # no .env: keep the scratch DATABASE_URL
+        }
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+            env=env,
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            for _ in range(100):
+                if server.poll() is not None:
+                    print("API server failed to start ❌")
+                    return 1
+                try:
+                    httpx.get(f"{base_url}/api/openapi.json", timeout=1)
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            return asyncio.run(run(args, base_url, server.pid))
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
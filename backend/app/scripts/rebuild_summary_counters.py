@@ -0,0 +1,44 @@
+"""
+Recompute the dashboard counters (TaskCounter) from the task table and
+report any drift from the incrementally maintained values.
+
+    docker compose exec api python -m app.scripts.rebuild_summary_counters
+    docker compose exec api python -m app.scripts.rebuild_summary_counters --check
+
+--check only reports (nothing is written) and exits 1 if drift was found.
+"""
+
+import argparse
+import sys
+
+from sqlmodel import Session
+
+from app.db import engine, init_db
+from app.services import counters
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--check", action="store_true", help="report drift without rewriting the counters")
+    args = parser.parse_args()
+
+    init_db()
+    with Session(engine) as session:
+        drift = counters.rebuild(session)
+        if args.check:
+            session.rollback()
+        else:
+            session.commit()
+
+    for (site_id, status, bucket), (stored, actual) in sorted(drift.items(), key=str):
+        print(f"site {site_id:>5}  {status.value:<15} {bucket:<14} stored {stored:>7}  actual {actual:>7}")
+
+    if drift:
+        print(f"{len(drift)} counter(s) drifted {'(not fixed, --check)' if args.check else '(rebuilt)'}")
+        return 1 if args.check else 0
+    print("Counters match the task table ✅")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""
+Check every InventoryStock.quantity against the stock ledger (newest
+checkpoint + the movements after it) and report drift.
+
+    docker compose exec api python -m app.scripts.reconcile_stock
+    docker compose exec api python -m app.scripts.reconcile_stock --checkpoint
+
+--checkpoint writes fresh checkpoints first (what the periodic job does).
+Exits with status 1 if any stock row disagrees with its ledger.
+"""
+
+import argparse
+import sys
+from datetime import datetime, timezone
+
+from sqlmodel import Session
+
+from app.db import engine, init_db
+from app.services import ledger
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoint", action="store_true", help="write ledger checkpoints before checking")
+    args = parser.parse_args()
+
+    init_db()
+    with Session(engine) as session:
+        if args.checkpoint:
+            written = ledger.write_checkpoints(session, datetime.now(timezone.utc) - ledger.CHECKPOINT_LAG)
+            session.commit()
+            print(f"{written} checkpoint(s) written")
+        drift = ledger.reconcile(session)
+
+    for d in drift:
+        print(f"stock {d['stock_id']:>7}  quantity {d['quantity']:>7}  ledger {d['ledger']:>7}  drift {d['drift']:>+7}")
+
+    if drift:
+        print(f"{len(drift)} stock row(s) disagree with the ledger ❌")
+        return 1
+    print("Stock quantities match the ledger ✅")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Concurrency stress test for stock movements. Fires many parallel
+/stock/{id}/move calls at one stock row (through the router function, each
+with its own session) and checks that no increment was lost: the final
+quantity must equal the start plus every accepted delta, and the movement
+log must hold exactly one row per accepted move.
+
+    docker compose exec api python -m app.scripts.stress_stock_moves --moves 500 --workers 32
+    docker compose exec api python -m app.scripts.stress_stock_moves --non-negative
+
+Uses the configured DATABASE_URL; creates its own site/item/stock rows and
+deletes them afterwards. Exits with status 1 on a lost or phantom update.
+"""
+
+import argparse
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import sqlalchemy as sa
+from fastapi import HTTPException
+from sqlmodel import Session, select
+
+from app.db import engine, init_db
+from app.models import InventoryItem, InventoryStock, Site, StockMovement
+from app.routers.inventory import StockMovePayload, move_stock
+
+
+def setup(start: int) -> tuple:
+    with Session(engine) as session:
+        site = Site(name="stress test")
+        item = InventoryItem(sku="STRESS", name="stress test")
+        session.add(site)
+        session.add(item)
+        session.flush()
+        stock = InventoryStock(site_id=site.id, item_id=item.id, quantity=start)
+        session.add(stock)
+        session.commit()
+        return site.id, item.id, stock.id
+
+
+def teardown(site_id: int, item_id: int, stock_id: int) -> None:
+    with Session(engine) as session:
+        session.exec(sa.delete(StockMovement).where(StockMovement.stock_id == stock_id))
+        session.exec(sa.delete(InventoryStock).where(InventoryStock.id == stock_id))
+        session.exec(sa.delete(InventoryItem).where(InventoryItem.id == item_id))
+        session.exec(sa.delete(Site).where(Site.id == site_id))
+        session.commit()
+
+
+def one_move(stock_id: int, delta: int, non_negative: bool) -> int:
+    """Returns the applied delta, or 0 if the guard rejected the move."""
+    with Session(engine) as session:
+        try:
+            move_stock(stock_id, StockMovePayload(delta=delta, non_negative=non_negative), session)
+        except HTTPException as exc:
+            if exc.status_code == 409:
+                return 0
+            raise
+    return delta
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--moves", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--start", type=int, default=100)
+    parser.add_argument("--non-negative", action="store_true", help="use the guard and mostly withdraw")
+    args = parser.parse_args()
+
+    init_db()
+    site_id, item_id, stock_id = setup(args.start)
+    try:
+        if args.non_negative:
+            deltas = [random.choice([-3, -2, -1, -1, 1]) for _ in range(args.moves)]
+        else:
+            deltas = [random.choice([-2, -1, 1, 3]) for _ in range(args.moves)]
+
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            applied = list(pool.map(lambda d: one_move(stock_id, d, args.non_negative), deltas))
+
+        with Session(engine) as session:
+            final = session.get(InventoryStock, stock_id).quantity
+            logged = session.exec(
+                select(sa.func.count(StockMovement.id), sa.func.coalesce(sa.func.sum(StockMovement.delta_qty), 0)).where(
+                    StockMovement.stock_id == stock_id
+                )
+            ).one()
+    finally:
+        teardown(site_id, item_id, stock_id)
+
+    accepted = sum(1 for a in applied if a)
+    expected = args.start + sum(applied)
+    print(f"{args.moves} moves on {args.workers} workers, {accepted} accepted")
+    print(f"final quantity {final}, expected {expected}; movement log: {logged[0]} rows, sum {logged[1]}")
+
+    ok = final == expected and logged[0] == accepted and args.start + logged[1] == final
+    if args.non_negative:
+        ok = ok and final >= 0
+    print("No lost updates ✅" if ok else "Stock quantity drifted ❌")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
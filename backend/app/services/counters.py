@@ -0,0 +1,219 @@
+"""
+Incrementally maintained dashboard counters (TaskCounter).
+
+Every task write calls `track(session, before, after)` in its own transaction,
+so /api/summary reads O(sites x statuses x buckets) rows instead of scanning
+the task table. Due-date buckets are relative to TaskCounterState.as_of and
+are moved forward by `refresh()`, which only re-buckets tasks whose due date
+lies between the old and new bucket boundaries.
+
+The state row is created, and the counters first built, by migration 0004 or
+`seed()` at startup, before any write can skip tracking for lack of it.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+import sqlalchemy as sa
+from sqlmodel import Session, select
+
+from ..db import dialect_insert
+from ..models import Status, Task, TaskCounter, TaskCounterState
+
+# (site_id, status, due_at) of a task as the counters see it
+Snapshot = Tuple[int, Status, Optional[datetime]]
+Key = Tuple[int, Status, str]
+
+def _utc(dt: datetime) -> datetime:
+    # SQLite hands datetimes back naive; everything we store is UTC
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _status(value) -> Status:
+    return value if isinstance(value, Status) else Status(value)
+
+
+@lru_cache(maxsize=64)  # as_of is the same for every task in a batch
+def _bounds(as_of: datetime) -> Tuple[datetime, datetime, datetime, datetime]:
+    as_of = _utc(as_of)
+    today = datetime(as_of.year, as_of.month, as_of.day, tzinfo=timezone.utc)
+    return today, as_of, today + timedelta(days=1), today + timedelta(days=7)
+
+
+def bucket_for(status: Status, due_at: Optional[datetime], as_of: datetime) -> str:
+    if due_at is None or _status(status) == Status.done:
+        return "none"
+    due = _utc(due_at)
+    today, now, tomorrow, week_end = _bounds(as_of)
+    if due < today:
+        return "overdue"
+    if due < now:
+        return "overdue_today"
+    if due < tomorrow:
+        return "today"
+    if due < week_end:
+        return "week"
+    return "later"
+
+
+def snapshot(task: Task) -> Snapshot:
+    return task.site_id, _status(task.status), task.due_at
+
+
+def _state(session: Session, lock: bool = False) -> Optional[TaskCounterState]:
+    # writers take a shared lock and refresh/rebuild an exclusive one, so a delta is
+    # never computed against an as_of that is being replaced (no-op on SQLite)
+    stmt = select(TaskCounterState).with_for_update(read=not lock)
+    return session.exec(stmt).first()
+
+
+def _apply(session: Session, deltas: Dict[Key, int]) -> None:
+    params = [
+        {"site_id": site_id, "status": status, "bucket": bucket, "count": n}
+        for (site_id, status, bucket), n in deltas.items()
+        if n
+    ]
+    if not params:
+        return
+    stmt = dialect_insert(session, TaskCounter)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["site_id", "status", "bucket"],
+        set_={"count": TaskCounter.count + stmt.excluded["count"]},
+    )
+    session.exec(stmt, params=params)
+
+
+def track(session: Session, before: Optional[Snapshot], after: Optional[Snapshot]) -> None:
+    """Move one task's contribution from `before` to `after` (None = not there)."""
+    track_many(session, [(before, after)])
+
+
+def track_many(session: Session, changes: Iterable[Tuple[Optional[Snapshot], Optional[Snapshot]]]) -> None:
+    """Apply many (before, after) task changes as one upsert batch."""
+    state = _state(session)
+    if state is None:
+        # not seeded (a database set up outside init_db / the migrations):
+        # nothing to keep current until seed() or a rebuild builds the counters
+        return
+    deltas: Dict[Key, int] = Counter()
+    for before, after in changes:
+        if before is not None:
+            site_id, status, due_at = before
+            deltas[(site_id, status, bucket_for(status, due_at, state.as_of))] -= 1
+        if after is not None:
+            site_id, status, due_at = after
+            deltas[(site_id, status, bucket_for(status, due_at, state.as_of))] += 1
+    _apply(session, deltas)
+
+
+def compute(session: Session, as_of: datetime) -> Dict[Key, int]:
+    """Counters recomputed from the task table (one grouped scan)."""
+    today, now, tomorrow, week_end = _bounds(as_of)
+    due = Task.due_at
+    bucket = sa.case(
+        (sa.or_(Task.status == Status.done, due.is_(None)), "none"),
+        (due < today, "overdue"),
+        (due < now, "overdue_today"),
+        (due < tomorrow, "today"),
+        (due < week_end, "week"),
+        else_="later",
+    ).label("bucket")
+    rows = session.exec(
+        select(Task.site_id, Task.status, bucket, sa.func.count(Task.id)).group_by(
+            Task.site_id, Task.status, sa.literal_column("bucket")
+        )
+    ).all()
+    return {(site_id, _status(status), b): n for site_id, status, b, n in rows}
+
+
+def stored(session: Session) -> Dict[Key, int]:
+    rows = session.exec(select(TaskCounter)).all()
+    return {(r.site_id, _status(r.status), r.bucket): r.count for r in rows if r.count}
+
+
+def _create_state(session: Session, now: datetime) -> bool:
+    stmt = dialect_insert(session, TaskCounterState).values(id=1, as_of=now)
+    return session.exec(stmt.on_conflict_do_nothing(index_elements=["id"])).rowcount == 1
+
+
+def seed(session: Session) -> bool:
+    """Build the counters if they never were (startup); True if it did. The caller commits."""
+    if session.exec(select(TaskCounterState.id)).first() is not None:
+        return False
+    rebuild(session)
+    return True
+
+
+def rebuild(session: Session, now: Optional[datetime] = None) -> Dict[Key, Tuple[int, int]]:
+    """
+    Recompute all counters from scratch. Returns the drift that was corrected,
+    {key: (stored, actual)}; empty when the incremental counters were exact.
+    """
+    now = now or datetime.now(timezone.utc)
+    # ON CONFLICT DO NOTHING: concurrent first builds cannot both insert the row
+    created = _create_state(session, now)
+    state = _state(session, lock=True)
+    drift: Dict[Key, Tuple[int, int]] = {}
+    if not created:
+        # compare against the stored as_of, so bucket ageing is not reported as drift
+        actual = compute(session, state.as_of)
+        current = stored(session)
+        for key in actual.keys() | current.keys():
+            if actual.get(key, 0) != current.get(key, 0):
+                drift[key] = (current.get(key, 0), actual.get(key, 0))
+
+    session.exec(sa.delete(TaskCounter))
+    _apply(session, compute(session, now))
+    state.as_of = now
+    session.add(state)
+    return drift
+
+
+def refresh(session: Session, now: Optional[datetime] = None) -> int:
+    """
+    Age the due-date buckets to `now`. Only tasks due between an old and a new
+    bucket boundary are read (via the open-tasks due_at index). Returns how many moved.
+    """
+    now = now or datetime.now(timezone.utc)
+    state = _state(session, lock=True)
+    if state is None:
+        rebuild(session, now)
+        return 0
+
+    old_bounds, new_bounds = _bounds(state.as_of), _bounds(now)
+    windows = [
+        sa.and_(Task.due_at >= min(old, new), Task.due_at < max(old, new))
+        for old, new in zip(old_bounds, new_bounds)
+        if old != new
+    ]
+    moved = 0
+    if windows:
+        rows = session.exec(
+            select(Task.site_id, Task.status, Task.due_at).where(Task.status != Status.done, sa.or_(*windows))
+        ).all()
+        deltas: Dict[Key, int] = Counter()
+        for site_id, status, due_at in rows:
+            old_b = bucket_for(status, due_at, state.as_of)
+            new_b = bucket_for(status, due_at, now)
+            if old_b != new_b:
+                deltas[(site_id, _status(status), old_b)] -= 1
+                deltas[(site_id, _status(status), new_b)] += 1
+                moved += 1
+        _apply(session, deltas)
+
+    state.as_of = now
+    session.add(state)
+    return moved
+
+
+def ensure_fresh(session: Session, max_age: timedelta) -> None:
+    """Age the counters if older than `max_age` (seeded at startup, see `seed()`)."""
+    now = datetime.now(timezone.utc)
+    state = session.exec(select(TaskCounterState)).first()
+    if state is None or now - _utc(state.as_of) < max_age:
+        return
+    refresh(session, now)
+    session.commit()
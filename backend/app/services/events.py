@@ -0,0 +1,161 @@
+"""
+Change notifications for GET /api/events (server-sent events).
+
+Write paths call `publish(topic, **data)` after they commit. It is sync and
+thread-safe (handlers run on the threadpool) and only hands the event to the
+event loop; the loop copies it into every subscriber's queue. An idle
+subscriber is a coroutine parked on its queue, so it costs nothing until an
+event or the keep-alive comes.
+
+With several uvicorn workers, set EVENTS_PG_NOTIFY=1 (Postgres only): events
+are then sent with pg_notify, and one listener thread per worker delivers
+everything on the channel (its own events included) to that worker's
+subscribers.
+
+Streams end when the app shuts down: `stop()` (lifespan) closes the broker
+and every open stream returns. uvicorn only runs the lifespan shutdown once
+open connections are gone, so run it with --timeout-graceful-shutdown (the
+Dockerfile does): idle streams are then cancelled after that timeout.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Set
+
+import sqlalchemy as sa
+
+from ..db import engine
+
+QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))  # per subscriber
+KEEPALIVE_SECONDS = float(os.getenv("EVENTS_KEEPALIVE_SECONDS", "15"))
+PG_NOTIFY = os.getenv("EVENTS_PG_NOTIFY", "0") == "1"
+CHANNEL = "rentalops_events"
+MAX_IDS = 200  # ids per event; more are summarized as a count (pg_notify payloads are < 8 kB)
+
+logger = logging.getLogger(__name__)
+
+
+class Subscriber:
+    def __init__(self, topics: Optional[Set[str]]) -> None:
+        self.topics = topics
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(QUEUE_SIZE)
+        self.lagged = False  # events were dropped because the client read too slowly
+        self.closed = False  # the server is shutting down: end the stream
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_subscribers: Set[Subscriber] = set()
+_listener: Optional[threading.Thread] = None
+_stopping = threading.Event()
+_closing = False
+
+
+def _fanout(event: Dict[str, Any]) -> None:
+    # on the event loop
+    for sub in _subscribers:
+        if sub.topics is not None and event["topic"] not in sub.topics:
+            continue
+        try:
+            sub.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            sub.lagged = True
+
+
+def _deliver(event: Dict[str, Any]) -> None:
+    loop = _loop
+    if loop is None or loop.is_closed():
+        return
+    loop.call_soon_threadsafe(_fanout, event)
+
+
+def publish(topic: str, **data: Any) -> None:
+    """Notify subscribers of a committed change. A no-op until `start()` ran."""
+    if _loop is None:
+        return
+    ids = data.get("ids")
+    if ids is not None and len(ids) > MAX_IDS:
+        data["ids"], data["count"] = None, len(ids)
+    event = {"topic": topic, **data}
+    if _listener is None:
+        _deliver(event)
+        return
+    try:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(sa.select(sa.func.pg_notify(CHANNEL, json.dumps(event, default=str))))
+    except Exception:
+        logger.exception("pg_notify failed; delivering %s locally only", topic)
+        _deliver(event)
+
+
+def subscribe(topics: Optional[Set[str]] = None) -> Subscriber:
+    sub = Subscriber(topics)
+    sub.closed = _closing
+    _subscribers.add(sub)
+    return sub
+
+
+def unsubscribe(sub: Subscriber) -> None:
+    _subscribers.discard(sub)
+
+
+def closing() -> bool:
+    return _closing
+
+
+def close() -> None:
+    """End every open stream (on the event loop). New subscribers are closed at once."""
+    global _closing
+    _closing = True
+    for sub in _subscribers:
+        sub.closed = True
+        try:
+            sub.queue.put_nowait(None)  # wakes a stream parked on its queue
+        except asyncio.QueueFull:
+            pass  # not parked: it sees `closed` after the events it is behind on
+
+
+def subscriber_count() -> int:
+    return len(_subscribers)
+
+
+def _listen() -> None:
+    """LISTEN on CHANNEL and hand every notification to the loop (own thread)."""
+    import psycopg
+
+    url = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+    while not _stopping.is_set():
+        try:
+            with psycopg.connect(url, autocommit=True) as conn:
+                conn.execute(f"LISTEN {CHANNEL}")
+                while not _stopping.is_set():
+                    for note in conn.notifies(timeout=1.0):
+                        _deliver(json.loads(note.payload))
+        except Exception:
+            logger.exception("event listener lost its connection; reconnecting")
+            _stopping.wait(5)
+
+
+def start() -> None:
+    """Bind the broker to the running event loop (app lifespan)."""
+    global _loop, _listener, _closing
+    _loop = asyncio.get_running_loop()
+    _closing = False
+    if PG_NOTIFY and engine.dialect.name == "postgresql":
+        _stopping.clear()
+        _listener = threading.Thread(target=_listen, name="events-listener", daemon=True)
+        _listener.start()
+
+
+def stop() -> None:
+    global _loop, _listener
+    if _loop is not None:
+        close()
+    _loop = None
+    _stopping.set()
+    if _listener is not None:
+        _listener.join(timeout=5)
+        _listener = None
@@ -0,0 +1,147 @@
+"""
+Recurrence forecast: every future occurrence of every template in a window.
+
+Each template contributes a lazy generator (its compiled Rule's `between`) and the
+generators are merged by date, so memory stays O(templates) however long the
+window is. A template's dates are cached per window widened to whole days
+(`_day_window`), so requests whose bounds move with the clock (the default
+`from` is now) share an entry; each read filters it to its exact bounds.
+Entries are tagged with the fields they depend on: an entry whose template changed since
+(schedule edits, materialization moving due_at) is dropped on the next read,
+and task update/delete drop it right away via `invalidate()`.
+"""
+from __future__ import annotations
+
+import heapq
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from ..models import Task
+from .materialize import template_filter
+from .recurrence import _same_tz, compile_rule
+
+CACHE_SIZE = int(os.getenv("FORECAST_CACHE_SIZE", "10000"))  # templates
+WINDOWS_PER_TEMPLATE = 8
+
+# template id -> (fingerprint, {(start, end): dates}), least recently used first
+_lock = threading.Lock()
+_cache: "OrderedDict[int, Tuple[tuple, Dict[tuple, Tuple[datetime, ...]]]]" = OrderedDict()
+
+
+def _fingerprint(t) -> tuple:
+    return (t.due_at, t.recurrence, t.recur_interval, t.recur_dow, t.recur_dom, t.recur_until)
+
+
+def _lookup(t, window: tuple) -> Optional[Tuple[datetime, ...]]:
+    """Cached dates of `t` for `window`, or None. Drops the entry if `t` changed since."""
+    with _lock:
+        entry = _cache.get(t.id)
+        if entry is None:
+            return None
+        if entry[0] != _fingerprint(t):
+            del _cache[t.id]
+            return None
+        _cache.move_to_end(t.id)
+        return entry[1].get(window)
+
+
+def _store(t, window: tuple, dates: Tuple[datetime, ...]) -> None:
+    with _lock:
+        entry = _cache.get(t.id)
+        if entry is None or entry[0] != _fingerprint(t):
+            entry = _cache[t.id] = (_fingerprint(t), {})
+        _cache.move_to_end(t.id)
+        windows = entry[1]
+        if window not in windows and len(windows) >= WINDOWS_PER_TEMPLATE:
+            windows.pop(next(iter(windows)))
+        windows[window] = dates
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _day_window(start: datetime, end: datetime) -> Tuple[datetime, datetime]:
+    """[start, end] widened to whole days: start floored, end ceiled to midnight."""
+    day_start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    day_end = end.replace(hour=0, minute=0, second=0, microsecond=0)
+    if day_end != end:
+        day_end += timedelta(days=1)
+    return day_start, day_end
+
+
+def _window_dates(t, start: datetime, end: datetime) -> Iterator[datetime]:
+    # the cached (or freshly generated) dates of the whole-day window
+    hit = _lookup(t, (start, end))
+    if hit is not None:
+        yield from hit
+        return
+
+    rule = compile_rule(t.recurrence, t.recur_interval, t.recur_dow, t.recur_dom)
+    if rule is None:
+        return
+    until = end if t.recur_until is None else min(_same_tz(end, t.recur_until), t.recur_until)
+    dates = []
+    for d in rule.between(t.due_at, start, until):
+        dates.append(d)
+        yield d
+    # only reached when the consumer took every date
+    _store(t, (start, end), tuple(dates))
+
+
+def template_dates(t, start: datetime, end: datetime) -> Iterator[datetime]:
+    """Occurrences of template `t` in [start, end] (capped by recur_until), cached."""
+    # read to the end (at most a day past `end`) so that a miss fills the cache
+    for d in _window_dates(t, *_day_window(start, end)):
+        if _same_tz(start, d) <= d <= _same_tz(end, d):
+            yield d
+
+
+def invalidate(template_id: int) -> None:
+    """Forget a template's cached dates (it changed or is gone)."""
+    with _lock:
+        _cache.pop(template_id, None)
+
+
+def _row(t, due_at: datetime) -> Dict:
+    return {
+        "template_id": t.id,
+        "title": t.title,
+        "site_id": t.site_id,
+        "unit_id": t.unit_id,
+        "assignee": t.assignee,
+        "priority": getattr(t.priority, "value", t.priority),
+        "due_at": due_at,
+    }
+
+
+def forecast(session: Session, start: datetime, end: datetime, site_id: Optional[int] = None) -> Iterator[Dict]:
+    """Yield one row per occurrence in [start, end], ordered by due_at then template id."""
+    stmt = select(
+        Task.id,
+        Task.site_id,
+        Task.unit_id,
+        Task.title,
+        Task.assignee,
+        Task.priority,
+        Task.due_at,
+        Task.recurrence,
+        Task.recur_interval,
+        Task.recur_dow,
+        Task.recur_dom,
+        Task.recur_until,
+    ).where(*template_filter())
+    if site_id is not None:
+        stmt = stmt.where(Task.site_id == site_id)
+    templates = session.exec(stmt.order_by(Task.id)).all()
+
+    def tagged(t) -> Iterable[Tuple[datetime, int, object]]:
+        for d in template_dates(t, start, end):
+            yield d, t.id, t
+
+    merged = heapq.merge(*(tagged(t) for t in templates), key=lambda x: (x[0], x[1]))
+    for due_at, _, t in merged:
+        yield _row(t, due_at)
@@ -0,0 +1,134 @@
+"""
+Stock ledger: InventoryStock.quantity is the running total, StockMovement the
+log of changes, StockCheckpoint periodic snapshots of the log.
+
+    quantity at T = newest checkpoint at or before T + movements after it up to T
+
+Checkpoints are written by the periodic job for every stock row that moved
+since its last one, and by upsert_stock, which sets a quantity outright
+instead of logging a movement. The job checkpoints as of `now - CHECKPOINT_LAG`
+so a movement whose transaction is still in flight is not skipped.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import sqlalchemy as sa
+from sqlmodel import Session, select
+
+from ..models import InventoryStock, StockCheckpoint, StockMovement
+
+CHECKPOINT_LAG = timedelta(seconds=int(os.getenv("STOCK_CHECKPOINT_LAG_SECONDS", "60")))
+
+logger = logging.getLogger(__name__)
+
+
+def _latest_checkpoints(at: Optional[datetime] = None):
+    """Subquery (stock_id, as_of, quantity): each stock row's newest checkpoint at or before `at`."""
+    cp = StockCheckpoint
+    ranked = select(
+        cp.stock_id,
+        cp.as_of,
+        cp.quantity,
+        sa.func.row_number().over(partition_by=cp.stock_id, order_by=(cp.as_of.desc(), cp.id.desc())).label("rn"),
+    )
+    if at is not None:
+        ranked = ranked.where(cp.as_of <= at)
+    ranked = ranked.subquery()
+    return select(ranked.c.stock_id, ranked.c.as_of, ranked.c.quantity).where(ranked.c.rn == 1).subquery()
+
+
+def _moved_since(latest, at: Optional[datetime] = None):
+    """Subquery (stock_id, delta, moves): movements after each row's checkpoint, up to `at`."""
+    mv = StockMovement
+    stmt = (
+        select(mv.stock_id, sa.func.sum(mv.delta_qty).label("delta"), sa.func.count(mv.id).label("moves"))
+        .select_from(mv)
+        .join(latest, latest.c.stock_id == mv.stock_id, isouter=True)
+        .where(sa.or_(latest.c.as_of.is_(None), mv.created_at > latest.c.as_of))
+        .group_by(mv.stock_id)
+    )
+    if at is not None:
+        stmt = stmt.where(mv.created_at <= at)
+    return stmt.subquery()
+
+
+def quantity_at(session: Session, stock_id: int, ts: datetime) -> Dict[str, Any]:
+    """Quantity of one stock row at `ts`: its newest checkpoint plus the movements after it."""
+    cp = session.exec(
+        select(StockCheckpoint)
+        .where(StockCheckpoint.stock_id == stock_id, StockCheckpoint.as_of <= ts)
+        .order_by(StockCheckpoint.as_of.desc(), StockCheckpoint.id.desc())
+        .limit(1)
+    ).first()
+
+    moves = select(sa.func.coalesce(sa.func.sum(StockMovement.delta_qty), 0), sa.func.count(StockMovement.id)).where(
+        StockMovement.stock_id == stock_id, StockMovement.created_at <= ts
+    )
+    if cp is not None:
+        moves = moves.where(StockMovement.created_at > cp.as_of)
+    delta, count = session.exec(moves).one()
+
+    return {
+        "stock_id": stock_id,
+        "ts": ts,
+        "quantity": (cp.quantity if cp else 0) + int(delta or 0),
+        "checkpoint_at": cp.as_of if cp else None,
+        "movements_replayed": count,
+    }
+
+
+def record_checkpoint(session: Session, stock_id: int, quantity: int, as_of: Optional[datetime] = None) -> None:
+    """Pin the ledger for `stock_id` at `quantity` (used where a quantity is set outright)."""
+    session.add(StockCheckpoint(stock_id=stock_id, quantity=quantity, as_of=as_of or datetime.now(timezone.utc)))
+
+
+def write_checkpoints(session: Session, as_of: datetime) -> int:
+    """
+    One INSERT … SELECT: a checkpoint at `as_of` for every stock row with
+    movements since its last checkpoint. Returns how many were written.
+    """
+    latest = _latest_checkpoints(as_of)
+    moved = _moved_since(latest, as_of)
+    rows = (
+        select(
+            moved.c.stock_id,
+            sa.literal(as_of, StockCheckpoint.__table__.c.as_of.type),
+            sa.func.coalesce(latest.c.quantity, 0) + moved.c.delta,
+        )
+        .select_from(moved)
+        .join(latest, latest.c.stock_id == moved.c.stock_id, isouter=True)
+    )
+    result = session.exec(
+        sa.insert(StockCheckpoint).from_select(["stock_id", "as_of", "quantity"], rows)
+    )
+    return result.rowcount
+
+
+def reconcile(session: Session) -> List[Dict[str, int]]:
+    """Stock rows whose quantity disagrees with the ledger: [{stock_id, quantity, ledger, drift}]."""
+    latest = _latest_checkpoints()
+    moved = _moved_since(latest)
+    ledger = sa.func.coalesce(latest.c.quantity, 0) + sa.func.coalesce(moved.c.delta, 0)
+    quantity = sa.func.coalesce(InventoryStock.quantity, 0)
+    rows = session.exec(
+        select(InventoryStock.id, quantity, ledger)
+        .join(latest, latest.c.stock_id == InventoryStock.id, isouter=True)
+        .join(moved, moved.c.stock_id == InventoryStock.id, isouter=True)
+        .where(quantity != ledger)
+        .order_by(InventoryStock.id)
+    ).all()
+    return [{"stock_id": i, "quantity": q, "ledger": l, "drift": q - l} for i, q, l in rows]
+
+
+def checkpoint_and_reconcile(session: Session, now: datetime) -> Dict[str, int]:
+    """The periodic ledger job. Returns {"created": checkpoints written}."""
+    created = write_checkpoints(session, now - CHECKPOINT_LAG)
+    session.commit()
+    drift = reconcile(session)
+    if drift:
+        logger.warning("stock ledger drift on %d stock row(s): %s", len(drift), drift[:20])
+    return {"created": created}
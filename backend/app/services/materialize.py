@@ -0,0 +1,206 @@
+"""
+Recurring-task materialization, set-based and chunked.
+
+Due templates are selected in SQL (ix_task_template_due), processed
+`batch_size` at a time with bulk INSERT / bulk UPDATE, and committed after
+every batch so no single write transaction holds the lock for long.
+"""
+from __future__ import annotations
+
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import sqlalchemy as sa
+from sqlmodel import Session, select
+
+from ..models import Priority, Status, Task
+from . import counters, versions
+from .recurrence import compile_rule, next_due, within_until
+
+BATCH_SIZE = int(os.getenv("MATERIALIZE_BATCH_SIZE", "500"))
+_TASKS = Task.__table__  # bulk writes go through Core: no ORM bookkeeping per row
+
+# what a batch needs from each template; plain rows, no ORM identity map
+_TEMPLATE_COLUMNS = (
+    Task.id,
+    Task.site_id,
+    Task.unit_id,
+    Task.title,
+    Task.description,
+    Task.priority,
+    Task.status,
+    Task.assignee,
+    Task.due_at,
+    Task.recurrence,
+    Task.recur_interval,
+    Task.recur_dow,
+    Task.recur_dom,
+    Task.recur_until,
+)
+
+
+def _update_templates(session: Session, updates: List[Dict]) -> None:
+    # Core executemany UPDATE … WHERE id = ?, one per set of columns
+    groups: Dict[tuple, List[Dict]] = {}
+    for u in updates:
+        groups.setdefault(tuple(sorted(u)), []).append(u)
+    for columns, params in groups.items():
+        stmt = (
+            _TASKS.update()
+            .where(_TASKS.c.id == sa.bindparam("_id"))
+            .values({c: sa.bindparam(c) for c in columns if c != "id"})
+        )
+        session.exec(stmt, params=[{**p, "_id": p["id"]} for p in params])
+
+
+def template_filter() -> tuple:
+    """Open recurring templates that have a schedule."""
+    return (
+        Task.is_recurring == True,
+        Task.recurrence.is_not(None),
+        Task.due_at.is_not(None),
+        Task.status != Status.done,
+    )
+
+
+def not_scheduled_this_cycle() -> sa.ColumnElement:
+    """The last_scheduled_at guard: this due_at has not been materialized yet."""
+    return sa.or_(Task.last_scheduled_at.is_(None), Task.last_scheduled_at < Task.due_at)
+
+
+def due_templates(now: datetime) -> tuple:
+    return (*template_filter(), Task.due_at <= now, not_scheduled_this_cycle())
+
+
+def occurrence_row(template, due_at: datetime, now: datetime) -> Dict:
+    """Insert params for one concrete task generated from `template`."""
+    return {
+        "site_id": template.site_id,
+        "unit_id": template.unit_id,
+        "title": template.title,
+        "description": template.description,
+        "priority": template.priority if isinstance(template.priority, Priority) else Priority.green,
+        "status": Status.new,
+        "assignee": template.assignee,
+        "due_at": due_at,
+        "created_at": now,
+        "updated_at": now,
+        "is_recurring": False,
+        "recurrence": None,
+        "recur_interval": None,
+        "recur_dow": None,
+        "recur_dom": None,
+        "recur_until": None,
+        "last_scheduled_at": None,
+    }
+
+
+def _utc(dt: datetime) -> datetime:
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _catch_up_dates(template, now: datetime, remaining: Optional[int]) -> Tuple[List[datetime], bool]:
+    """
+    Every occurrence `template` is owed as of `now`: those due by now plus the
+    next upcoming one, worked out in closed form. Returns (dates, ended) where
+    `ended` means recur_until cut the series short.
+    """
+    rule = compile_rule(template.recurrence, template.recur_interval, template.recur_dow, template.recur_dom)
+    if rule is None:
+        return [], True
+    k = rule.count_until(template.due_at, now) + 1
+    ended = False
+    if template.recur_until is not None:
+        k_until = rule.count_until(template.due_at, template.recur_until)
+        if k_until < k:
+            k, ended = k_until, True
+    if remaining is not None and k > remaining:
+        k, ended = remaining, False
+    return [rule.nth(template.due_at, i) for i in range(1, k + 1)], ended
+
+
+def materialize(
+    session: Session,
+    now: Optional[datetime] = None,
+    limit: Optional[int] = None,
+    batch_size: int = BATCH_SIZE,
+    catch_up: bool = False,
+) -> Dict[str, int]:
+    """
+    Create the next occurrence for each due template and advance its due_at.
+    With `catch_up`, create every occurrence a template has fallen behind on
+    (up to the first one after `now`, capped by recur_until) in the same pass.
+    Returns counts of occurrences created, templates skipped by the
+    per-cycle guard, and templates expired by recur_until.
+    """
+    now = now or datetime.now(timezone.utc)
+    created = expired = 0
+    after = None  # keyset position (due_at, id): advanced templates are never rescanned
+
+    while limit is None or created < limit:
+        take = batch_size if limit is None else min(batch_size, limit - created)
+        stmt = select(*_TEMPLATE_COLUMNS).where(*due_templates(now))
+        if after is not None:
+            # the leading due_at >= bound lets the index seek past the templates
+            # already done instead of rescanning them on every batch
+            stmt = stmt.where(
+                Task.due_at >= after[0],
+                sa.or_(Task.due_at > after[0], Task.id > after[1]),
+            )
+        rows = session.exec(stmt.order_by(Task.due_at, Task.id).limit(take)).all()
+        if not rows:
+            break
+        after = (rows[-1].due_at, rows[-1].id)
+        version = versions.bump(session, versions.TASK)
+
+        occurrences: List[Dict] = []
+        template_updates: List[Dict] = []
+        changes = []
+        for t in rows:
+            if catch_up:
+                remaining = None if limit is None else limit - created - len(occurrences)
+                if remaining == 0:
+                    break
+                dates, ended = _catch_up_dates(t, now, remaining)
+            else:
+                nd = next_due(
+                    due_at=t.due_at,
+                    recurrence=t.recurrence,
+                    recur_interval=t.recur_interval,
+                    recur_dow=t.recur_dow,
+                    recur_dom=t.recur_dom,
+                )
+                ended = not within_until(nd, t.recur_until)
+                dates = [] if ended else [nd]
+
+            if not dates:
+                template_updates.append({"id": t.id, "last_scheduled_at": now, "updated_at": now, "version": version})
+                expired += 1
+                continue
+
+            nd = dates[-1]
+            occurrences.extend({**occurrence_row(t, d, now), "version": version} for d in dates)
+            update = {"id": t.id, "due_at": nd, "updated_at": now, "version": version}
+            if ended or _utc(nd) > now or not catch_up:
+                # done for this cycle; a limit-truncated catch-up stays eligible
+                update["last_scheduled_at"] = now
+            template_updates.append(update)
+            expired += ended
+            changes.extend((None, (t.site_id, Status.new, d)) for d in dates)
+            changes.append(((t.site_id, t.status, t.due_at), (t.site_id, t.status, nd)))
+
+        if occurrences:
+            session.exec(_TASKS.insert(), params=occurrences)
+        _update_templates(session, template_updates)
+        counters.track_many(session, changes)
+        session.commit()
+        created += len(occurrences)
+
+    skipped = session.exec(
+        select(sa.func.count(Task.id)).where(
+            *template_filter(), Task.due_at <= now, sa.not_(not_scheduled_this_cycle())
+        )
+    ).one()
+
+    return {"created": created, "skipped": int(skipped or 0), "expired": expired}
@@ -1,7 +1,9 @@
 from __future__ import annotations
 from datetime import datetime, timedelta, timezone
 from calendar import monthrange
-from typing import Optional, Literal
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterator, Optional, Literal
 
 Recurrence = Literal["daily", "weekly", "monthly", "quarterly", "yearly"]
 
@@ -51,6 +53,139 @@ def next_due(
 
     return None
 
+_MONTH_STEP = {"monthly": 1, "quarterly": 3, "yearly": 12}
+
+def _same_tz(dt: datetime, like: datetime) -> datetime:
+    """Make `dt` comparable with `like` (DB datetimes come back naive UTC)."""
+    if like.tzinfo is None and dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    if like.tzinfo is not None and dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+@lru_cache(maxsize=4096)
+def _min_month_len(year: int, month: int, step: int, k: int) -> int:
+    # month lengths repeat within 48 months, so later steps cannot lower the minimum
+    shortest = 31
+    for j in range(1, min(k, 48) + 1):
+        total = month - 1 + step * j
+        shortest = min(shortest, monthrange(year + total // 12, total % 12 + 1)[1])
+    return shortest
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    A recurrence rule compiled once (see `compile_rule`), answering "k-th
+    occurrence after due_at" and "how many by `until`" in closed form.
+    nth(due_at, k) is the date next_due reaches after k steps from due_at.
+    """
+    recurrence: Recurrence
+    interval: int
+    dow: Optional[int]
+    dom: Optional[int]
+
+    def nth(self, due_at: datetime, k: int) -> datetime:
+        if k <= 0:
+            return due_at
+        if self.recurrence == "daily":
+            return due_at + timedelta(days=self.interval * k)
+        if self.recurrence == "weekly":
+            # only the first step snaps to recur_dow; after that it is whole weeks
+            first = next_due(due_at, "weekly", self.interval, self.dow)
+            return first + timedelta(weeks=self.interval * (k - 1))
+
+        step = _MONTH_STEP[self.recurrence] * self.interval
+        total = due_at.month - 1 + step * k
+        y, m = due_at.year + total // 12, total % 12 + 1
+        if self.dom is None:
+            # add_months clamps each step, so a short month lowers every later day
+            day = min(due_at.day, _min_month_len(due_at.year, due_at.month, step, min(k, 48)))
+        else:
+            day = min(max(1, self.dom), monthrange(y, m)[1])
+        return due_at.replace(year=y, month=m, day=day)
+
+    def count_until(self, due_at: datetime, until: datetime) -> int:
+        """How many occurrences after due_at fall on or before `until`."""
+        until = _same_tz(until, due_at)
+        if self.recurrence == "daily":
+            return max(0, (until - due_at) // timedelta(days=self.interval))
+        if self.recurrence == "weekly":
+            first = self.nth(due_at, 1)
+            if first > until:
+                return 0
+            return 1 + (until - first) // timedelta(weeks=self.interval)
+
+        step = _MONTH_STEP[self.recurrence] * self.interval
+        months = (until.year - due_at.year) * 12 + until.month - due_at.month
+        k = max(0, months // step)
+        # the month estimate is off by at most one step either way
+        while k > 0 and self.nth(due_at, k) > until:
+            k -= 1
+        while self.nth(due_at, k + 1) <= until:
+            k += 1
+        return k
+
+    def between(self, due_at: datetime, start: Optional[datetime], end: Optional[datetime]) -> Iterator[datetime]:
+        """
+        Lazily yield the occurrences after due_at that fall in [start, end], in order.
+        Jumps straight to the first one at or after `start`; `end=None` never stops.
+        """
+        k = 1
+        if start is not None:
+            k += self.count_until(due_at, start - timedelta(microseconds=1))
+        end = _same_tz(end, due_at) if end is not None else None
+        while True:
+            nd = self.nth(due_at, k)
+            if end is not None and nd > end:
+                return
+            yield nd
+            k += 1
+
+@lru_cache(maxsize=1024)
+def compile_rule(
+    recurrence: Optional[Recurrence],
+    recur_interval: Optional[int] = 1,
+    recur_dow: Optional[int] = None,
+    recur_dom: Optional[int] = None,
+) -> Optional[Rule]:
+    """The Rule for these template fields (memoized); None if there is no schedule."""
+    if recurrence not in ("daily", "weekly") and recurrence not in _MONTH_STEP:
+        return None
+    return Rule(
+        recurrence=recurrence,
+        interval=max(1, recur_interval or 1),
+        dow=recur_dow if recurrence == "weekly" else None,
+        dom=recur_dom if recurrence in _MONTH_STEP else None,
+    )
+
+def nth_due(
+    due_at: Optional[datetime],
+    recurrence: Optional[Recurrence],
+    recur_interval: Optional[int] = 1,
+    recur_dow: Optional[int] = None,
+    recur_dom: Optional[int] = None,
+    k: int = 1,
+) -> Optional[datetime]:
+    """The k-th occurrence after due_at (same as applying next_due k times). k=0 returns due_at."""
+    rule = compile_rule(recurrence, recur_interval, recur_dow, recur_dom)
+    if not due_at or rule is None:
+        return None
+    return rule.nth(due_at, k)
+
+def count_until(
+    due_at: Optional[datetime],
+    recurrence: Optional[Recurrence],
+    recur_interval: Optional[int] = 1,
+    recur_dow: Optional[int] = None,
+    recur_dom: Optional[int] = None,
+    until: Optional[datetime] = None,
+) -> int:
+    """How many occurrences after due_at fall on or before `until`."""
+    rule = compile_rule(recurrence, recur_interval, recur_dow, recur_dom)
+    if not due_at or rule is None or until is None:
+        return 0
+    return rule.count_until(due_at, until)
+
 def within_until(nd: Optional[datetime], until: Optional[datetime]) -> bool:
     if nd is None:
         return False
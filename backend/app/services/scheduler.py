@@ -0,0 +1,222 @@
+"""
+Periodic background jobs, run inside the API process: recurring-task
+materialization and stock ledger checkpoints.
+
+Every uvicorn worker starts the loops from the app lifespan, but a run only
+happens while holding the job's lock: a Postgres advisory lock, or on SQLite a
+lease on the job's JobState row. JobState also records the last run, so a worker
+that wakes up right after another one finished skips its turn, and any worker
+can report the stats (GET /api/maintenance/scheduler).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import zlib
+from contextlib import contextmanager, suppress
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import sqlalchemy as sa
+from sqlmodel import Session
+
+from ..db import dialect_insert, engine
+from ..models import JobState
+from . import events
+from .ledger import checkpoint_and_reconcile
+from .materialize import materialize
+
+INTERVAL_SECONDS = int(os.getenv("MATERIALIZE_INTERVAL_SECONDS", "300"))  # 0 = scheduler off
+LEASE_SECONDS = int(os.getenv("MATERIALIZE_LEASE_SECONDS", "900"))
+# off by default, like the endpoint's catch_up: backfilling missed occurrences is opt-in
+CATCH_UP = os.getenv("MATERIALIZE_CATCH_UP", "0") == "1"
+CHECKPOINT_INTERVAL_SECONDS = int(os.getenv("STOCK_CHECKPOINT_INTERVAL_SECONDS", "86400"))  # 0 = off
+
+JOB = "materialize"
+CHECKPOINT_JOB = "stock_checkpoint"
+_ADVISORY_BASE = 0x72656375  # pg_try_advisory_lock keys: base + crc32(job name)
+_WORKER = f"{socket.gethostname()}:{os.getpid()}"
+
+logger = logging.getLogger(__name__)
+
+
+def _utc(dt: datetime) -> datetime:
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _ensure_row(session: Session, name: str) -> None:
+    stmt = dialect_insert(session, JobState).values(name=name).on_conflict_do_nothing(index_elements=["name"])
+    session.exec(stmt)
+    session.commit()
+
+
+@contextmanager
+def job_lock(name: str = JOB, now: Optional[datetime] = None) -> Iterator[bool]:
+    """
+    Try to become the only process running `name`. Yields whether we got it;
+    never blocks. The lock is dropped on exit, or when the process dies
+    (advisory lock: with the connection; lease: after LEASE_SECONDS).
+    """
+    now = now or datetime.now(timezone.utc)
+    with Session(engine) as session:
+        _ensure_row(session, name)
+
+        if session.get_bind().dialect.name == "postgresql":
+            # session-level lock on a connection of its own, outside any transaction
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                key = _ADVISORY_BASE + zlib.crc32(name.encode())
+                got = bool(conn.scalar(sa.select(sa.func.pg_try_advisory_lock(key))))
+                try:
+                    yield got
+                finally:
+                    if got:
+                        conn.scalar(sa.select(sa.func.pg_advisory_unlock(key)))
+            return
+
+        got = session.exec(
+            sa.update(JobState)
+            .where(
+                JobState.name == name,
+                sa.or_(JobState.holder.is_(None), JobState.locked_until < now),
+            )
+            .values(holder=_WORKER, locked_until=now + timedelta(seconds=LEASE_SECONDS))
+        ).rowcount == 1
+        session.commit()
+        try:
+            yield got
+        finally:
+            if got:
+                session.exec(
+                    sa.update(JobState)
+                    .where(JobState.name == name, JobState.holder == _WORKER)
+                    .values(holder=None, locked_until=None)
+                )
+                session.commit()
+
+
+def _run_job(
+    name: str,
+    interval: int,
+    work: Callable[[Session, datetime], Dict[str, int]],
+    now: datetime,
+    force: bool,
+) -> Optional[Dict[str, int]]:
+    """
+    Run `work` under the job lock and record the run in JobState.
+    Returns its counts, or None when another worker holds the lock
+    or (unless `force`) the job already ran within the last interval.
+    """
+    with job_lock(name, now) as got:
+        if not got:
+            return None
+        with Session(engine) as session:
+            state = session.get(JobState, name)
+            if (
+                not force
+                and state.last_finished_at is not None
+                and now - _utc(state.last_finished_at) < timedelta(seconds=interval)
+            ):
+                return None
+
+            started = time.perf_counter()
+            try:
+                result = work(session, now)
+            except Exception as exc:
+                session.rollback()
+                # a failed run is reported like any other; last_finished_at stays
+                # at the last successful run, so the next wake-up retries
+                state = session.get(JobState, name)
+                state.last_started_at = now
+                state.last_duration_ms = round((time.perf_counter() - started) * 1000)
+                state.last_created = state.last_skipped = state.last_expired = 0
+                state.last_error = repr(exc)[:500]
+                session.add(state)
+                session.commit()
+                raise
+
+            state = session.get(JobState, name)
+            state.last_started_at = now
+            state.last_finished_at = datetime.now(timezone.utc)
+            state.last_duration_ms = round((time.perf_counter() - started) * 1000)
+            state.last_created = result.get("created", 0)
+            state.last_skipped = result.get("skipped", 0)
+            state.last_expired = result.get("expired", 0)
+            state.last_error = None
+            session.add(state)
+            session.commit()
+            return result
+
+
+def run_once(now: Optional[datetime] = None, force: bool = False, **options: Any) -> Optional[Dict[str, int]]:
+    """Materialize recurring tasks under the job lock; see _run_job."""
+    options.setdefault("catch_up", CATCH_UP)
+    result = _run_job(
+        JOB,
+        INTERVAL_SECONDS,
+        lambda session, now: materialize(session, now, **options),
+        now or datetime.now(timezone.utc),
+        force,
+    )
+    if result and (result.get("created") or result.get("expired")):
+        events.publish("task", action="materialized", created=result.get("created", 0))
+    return result
+
+
+def run_checkpoints(now: Optional[datetime] = None, force: bool = False) -> Optional[Dict[str, int]]:
+    """Write stock ledger checkpoints and reconcile quantities under the job lock."""
+    return _run_job(
+        CHECKPOINT_JOB,
+        CHECKPOINT_INTERVAL_SECONDS,
+        checkpoint_and_reconcile,
+        now or datetime.now(timezone.utc),
+        force,
+    )
+
+
+def _last_run(session: Session, name: str) -> Dict[str, Any]:
+    state = session.get(JobState, name)
+    return state.model_dump(exclude={"name", "holder", "locked_until"}) if state else {}
+
+
+def status() -> Dict[str, Any]:
+    with Session(engine) as session:
+        last = _last_run(session, JOB)
+        checkpoints = _last_run(session, CHECKPOINT_JOB)
+    return {
+        "enabled": INTERVAL_SECONDS > 0,
+        "interval_seconds": INTERVAL_SECONDS,
+        "catch_up": CATCH_UP,
+        **last,
+        CHECKPOINT_JOB: {
+            "enabled": CHECKPOINT_INTERVAL_SECONDS > 0,
+            "interval_seconds": CHECKPOINT_INTERVAL_SECONDS,
+            **checkpoints,
+        },
+    }
+
+
+async def run_periodically(job: Callable[[], Any], interval: int) -> None:
+    while True:
+        try:
+            # the work is sync DB I/O; keep it off the event loop
+            await asyncio.to_thread(job)
+        except Exception:
+            logger.exception("scheduled job %s failed", getattr(job, "__name__", job))
+        await asyncio.sleep(interval)
+
+
+def start() -> List[asyncio.Task]:
+    """Start the enabled job loops on the running event loop."""
+    jobs = [(run_once, INTERVAL_SECONDS), (run_checkpoints, CHECKPOINT_INTERVAL_SECONDS)]
+    return [asyncio.create_task(run_periodically(job, interval)) for job, interval in jobs if interval > 0]
+
+
+async def stop(tasks: List[asyncio.Task]) -> None:
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        with suppress(asyncio.CancelledError):
+            await task
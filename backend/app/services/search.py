@@ -0,0 +1,137 @@
+"""
+Full-text search over Task.title / Task.description.
+
+SQLite: external-content FTS5 table `task_fts`, kept in sync by triggers.
+Postgres: stored generated `task.search_vector` column with a GIN index.
+Both use prefix matching on every word of the query and rank by relevance.
+"""
+from __future__ import annotations
+
+import re
+from typing import List, Optional
+
+import sqlalchemy as sa
+
+from ..models import Task
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS task_fts USING fts5(
+        title, description, content='task', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS task_fts_ai AFTER INSERT ON task BEGIN
+        INSERT INTO task_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS task_fts_ad AFTER DELETE ON task BEGIN
+        INSERT INTO task_fts(task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS task_fts_au AFTER UPDATE OF title, description ON task BEGIN
+        INSERT INTO task_fts(task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO task_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+_POSTGRES_DDL = [
+    """
+    ALTER TABLE task ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_task_search_vector ON task USING gin (search_vector)",
+]
+
+task_fts = sa.table("task_fts", sa.column("rowid", sa.Integer))
+RANK_DECIMALS = 6
+
+
+def install_search_index(conn: sa.Connection) -> None:
+    """Create the search index for the connected backend. Safe to run repeatedly."""
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        fresh = not conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'task_fts'"
+        ).first()
+        for ddl in _SQLITE_DDL:
+            conn.exec_driver_sql(ddl)
+        if fresh:
+            # index rows that existed before the triggers did
+            conn.exec_driver_sql("INSERT INTO task_fts(task_fts) VALUES ('rebuild')")
+    elif dialect == "postgresql":
+        for ddl in _POSTGRES_DDL:
+            conn.exec_driver_sql(ddl)
+
+
+def drop_search_index(conn: sa.Connection) -> None:
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        for name in ("task_fts_ai", "task_fts_ad", "task_fts_au"):
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+        conn.exec_driver_sql("DROP TABLE IF EXISTS task_fts")
+    elif dialect == "postgresql":
+        conn.exec_driver_sql("DROP INDEX IF EXISTS ix_task_search_vector")
+        conn.exec_driver_sql("ALTER TABLE task DROP COLUMN IF EXISTS search_vector")
+
+
+def search_words(q: Optional[str]) -> List[str]:
+    """Split a user query into the words we match on (punctuation dropped)."""
+    return re.findall(r"\w+", q.lower()) if q else []
+
+
+def _tsquery(words: List[str]):
+    return sa.func.to_tsquery(sa.literal_column("'simple'"), " & ".join(f"{w}:*" for w in words))
+
+
+def _rounded(score: sa.ColumnElement) -> sa.ColumnElement:
+    # keyset cursors compare the score for equality to break ties by id; a float
+    # computed per query need not round-trip exactly, six decimals do
+    return sa.cast(sa.func.round(sa.cast(score, sa.Numeric), RANK_DECIMALS), sa.Float)
+
+
+def search_rank(dialect: str, words: List[str]) -> Optional[sa.ColumnElement]:
+    """
+    Relevance of a row for `words`, lower = better, rounded to RANK_DECIMALS.
+    None if the backend cannot rank.
+    """
+    if dialect == "sqlite":
+        # bm25() weights: title counts 4x description
+        return _rounded(sa.func.bm25(sa.literal_column("task_fts"), 4.0, 1.0))
+    if dialect == "postgresql":
+        return _rounded(-sa.func.ts_rank(sa.literal_column("task.search_vector"), _tsquery(words)))
+    return None
+
+
+def apply_search(stmt, dialect: str, words: List[str]):
+    """Restrict a Task select to rows containing every word (as a prefix)."""
+    if dialect == "sqlite":
+        fts = sa.literal_column("task_fts")
+        match = " ".join(f'"{w}"*' for w in words)
+        return stmt.join(task_fts, task_fts.c.rowid == Task.id).where(fts.op("MATCH")(match))
+
+    if dialect == "postgresql":
+        vector = sa.literal_column("task.search_vector")
+        return stmt.where(vector.op("@@")(_tsquery(words)))
+
+    # unknown backend: plain substring match on each word ("_" is a word
+    # character, so LIKE wildcards must be escaped)
+    for w in words:
+        pattern = "%" + w.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        stmt = stmt.where(
+            sa.or_(
+                sa.func.lower(Task.title).like(pattern, escape="\\"),
+                sa.func.lower(Task.description).like(pattern, escape="\\"),
+            )
+        )
+    return stmt
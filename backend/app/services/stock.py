@@ -0,0 +1,171 @@
+"""
+Stock quantity writes. Quantities only ever change through `apply_delta`, a
+single UPDATE … SET quantity = quantity + :delta RETURNING quantity, so
+concurrent movements on the same row cannot overwrite each other.
+"""
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import sqlalchemy as sa
+from sqlmodel import Session, select
+
+from ..db import dialect_insert
+from ..models import InventoryStock, MovementReason, StockMovement
+
+
+class InsufficientStock(Exception):
+    """The movement would take the quantity below zero."""
+
+
+class StockNotFound(Exception):
+    """There is no stock row for the item at the site."""
+
+
+def apply_delta(session: Session, stock_id: int, delta: int, non_negative: bool = False) -> Optional[int]:
+    """
+    Add `delta` to the stock row in the current transaction and return the new
+    quantity, or None if the row does not exist. With `non_negative`, the guard
+    is part of the same UPDATE and InsufficientStock is raised when it fails.
+    """
+    quantity = sa.func.coalesce(InventoryStock.quantity, 0)
+    stmt = (
+        sa.update(InventoryStock)
+        .where(InventoryStock.id == stock_id)
+        .values(quantity=quantity + delta, updated_at=datetime.now(timezone.utc))
+        .returning(InventoryStock.quantity)
+    )
+    if non_negative:
+        stmt = stmt.where(quantity + delta >= 0)
+    new_quantity = session.exec(stmt).scalar_one_or_none()
+    if new_quantity is None and non_negative and session.get(InventoryStock, stock_id) is not None:
+        raise InsufficientStock(stock_id)
+    return new_quantity
+
+
+def lock_quantities(session: Session, stock_ids: Sequence[int]) -> Dict[int, int]:
+    """
+    Current quantities of `stock_ids`, row-locked until the end of the
+    transaction (in id order, so concurrent callers cannot deadlock).
+    """
+    rows = session.exec(
+        select(InventoryStock.id, InventoryStock.quantity)
+        .where(InventoryStock.id.in_(sorted(set(stock_ids))))
+        .order_by(InventoryStock.id)
+        .with_for_update()
+    ).all()
+    return {stock_id: quantity or 0 for stock_id, quantity in rows}
+
+
+def apply_deltas(
+    session: Session, deltas: Dict[int, int], floors: Optional[Dict[int, int]] = None
+) -> Dict[int, int]:
+    """
+    Add many per-row deltas in one UPDATE; returns the new quantity per stock id.
+    `floors` guards rows inside the same UPDATE: a row is only changed while
+    quantity + floor >= 0, and InsufficientStock (with the failed ids) is raised
+    if any guarded row was not. The caller then rolls back.
+    """
+    floors = {stock_id: f for stock_id, f in (floors or {}).items() if stock_id in deltas}
+    # a guarded row stays in even at a net delta of 0: its moves may dip below zero on the way
+    deltas = {stock_id: d for stock_id, d in deltas.items() if d or stock_id in floors}
+    if not deltas:
+        return {}
+    quantity = sa.func.coalesce(InventoryStock.quantity, 0)
+    stmt = (
+        sa.update(InventoryStock)
+        .where(InventoryStock.id.in_(deltas))
+        .values(
+            quantity=quantity + sa.case(deltas, value=InventoryStock.id, else_=0),
+            updated_at=datetime.now(timezone.utc),
+        )
+        .returning(InventoryStock.id, InventoryStock.quantity)
+        .execution_options(synchronize_session=False)
+    )
+    if floors:
+        stmt = stmt.where(
+            sa.or_(
+                InventoryStock.id.not_in(floors),
+                quantity + sa.case(floors, value=InventoryStock.id, else_=0) >= 0,
+            )
+        )
+    result = {stock_id: q for stock_id, q in session.exec(stmt).all()}
+    failed = sorted(set(floors) - set(result))
+    if failed:
+        raise InsufficientStock(*failed)
+    return result
+
+
+def insert_movements(session: Session, movements: List[Dict]) -> List[int]:
+    """executemany INSERT of StockMovement rows; returns their ids in input order."""
+    if not movements:
+        return []
+    now = datetime.now(timezone.utc)
+    params = [
+        {
+            "stock_id": m["stock_id"],
+            "delta_qty": m["delta_qty"],
+            "reason": m.get("reason") or MovementReason.usage,
+            "reference": m.get("reference"),
+            "author": m.get("author"),
+            "created_at": now,
+        }
+        for m in movements
+    ]
+    stmt = sa.insert(StockMovement).returning(StockMovement.id, sort_by_parameter_order=True)
+    return list(session.exec(stmt, params=params).scalars())
+
+
+def transfer(
+    session: Session,
+    item_id: int,
+    from_site_id: int,
+    to_site_id: int,
+    quantity: int,
+    reference: Optional[str] = None,
+    author: Optional[str] = None,
+    non_negative: bool = True,
+) -> Dict[str, Any]:
+    """
+    Move `quantity` of an item between sites in the current transaction: a
+    debit and a credit movement (reason transfer) sharing one reference. The
+    destination stock row is created if missing, so the caller must have
+    checked that the item and both sites exist. Both rows are locked in id
+    order, so two transfers in opposite directions cannot deadlock.
+    """
+    reference = reference or f"transfer:{uuid.uuid4().hex[:12]}"
+    now = datetime.now(timezone.utc)
+    session.exec(
+        dialect_insert(session, InventoryStock)
+        .values(site_id=to_site_id, item_id=item_id, quantity=0, updated_at=now)
+        .on_conflict_do_nothing(index_elements=["site_id", "item_id"])
+    )
+    rows = session.exec(
+        select(InventoryStock.id, InventoryStock.site_id, InventoryStock.quantity)
+        .where(InventoryStock.item_id == item_id, InventoryStock.site_id.in_([from_site_id, to_site_id]))
+        .order_by(InventoryStock.id)
+        .with_for_update()
+    ).all()
+    by_site = {site_id: (stock_id, qty or 0) for stock_id, site_id, qty in rows}
+    if from_site_id not in by_site:
+        raise StockNotFound(from_site_id, item_id)
+    (src, src_qty), (dst, _) = by_site[from_site_id], by_site[to_site_id]
+    if non_negative and src_qty < quantity:
+        raise InsufficientStock(src)
+
+    debit, credit = insert_movements(
+        session,
+        [
+            {"stock_id": src, "delta_qty": -quantity, "reason": MovementReason.transfer, "reference": reference, "author": author},
+            {"stock_id": dst, "delta_qty": quantity, "reason": MovementReason.transfer, "reference": reference, "author": author},
+        ],
+    )
+    # the check above is repeated inside the UPDATE: FOR UPDATE does not lock on SQLite
+    quantities = apply_deltas(session, {src: -quantity, dst: quantity}, {src: -quantity} if non_negative else None)
+    return {
+        "reference": reference,
+        "from": {"stock_id": src, "movement_id": debit, "quantity": quantities[src]},
+        "to": {"stock_id": dst, "movement_id": credit, "quantity": quantities[dst]},
+    }
@@ -0,0 +1,112 @@
+"""
+Attachment thumbnails, generated on a small worker pool after an upload commits
+so the request never waits on image decoding.
+
+Each image gets one WebP per size in SIZES (longest edge, in px), stored next to
+the original: uploads/ab/<sha>.jpg -> uploads/ab/<sha>_160.webp, … Since files
+are content-addressed, a thumbnail that already exists is reused. The result is
+recorded on TaskAttachment.thumbnails as {"160": "/uploads/ab/<sha>_160.webp", …};
+it stays NULL while pending (or if rendering failed for a reason other than the
+file itself) and is {} for files that are not images.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+from sqlmodel import Session
+
+from ..db import engine
+from ..models import TaskAttachment
+from . import uploads
+
+SIZES = (1024, 480, 160)  # largest first: each one is scaled down from the previous
+WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))  # 0 = off
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _thumb_path(original: str, size: int) -> str:
+    stem, _ = os.path.splitext(original)
+    return f"{stem}_{size}.webp"
+
+
+def render(original: str) -> Dict[str, str]:
+    """Write the thumbnails for one stored file (path relative to UPLOAD_DIR); returns {size: public path}."""
+    wanted = {size: _thumb_path(original, size) for size in SIZES}
+    if all((uploads.UPLOAD_DIR / p).exists() for p in wanted.values()):
+        return {str(size): uploads.public_url(p) for size, p in wanted.items()}
+
+    try:
+        img = Image.open(uploads.UPLOAD_DIR / original)
+        # JPEG: decode at a reduced scale straight away instead of at full size
+        img.draft("RGB", (SIZES[0], SIZES[0]))
+        img.load()  # decode here, so a broken file is told apart from a failed write below
+        img = ImageOps.exif_transpose(img)
+    except FileNotFoundError:
+        raise
+    except (UnidentifiedImageError, OSError):
+        return {}  # not an image (or not one Pillow can decode)
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+
+    out = {}
+    for size in SIZES:
+        img.thumbnail((size, size), Image.Resampling.LANCZOS)
+        dest: Path = uploads.UPLOAD_DIR / wanted[size]
+        # the same content uploaded twice renders twice at once: each render
+        # writes its own temp file, and the last identical replace wins
+        fd, tmp = tempfile.mkstemp(dir=dest.parent, prefix=f".{dest.stem}-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                img.save(f, "WEBP", quality=80)
+            os.chmod(tmp, 0o644)  # mkstemp creates 0600
+            os.replace(tmp, dest)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        out[str(size)] = uploads.public_url(wanted[size])
+    return out
+
+
+def _generate(attachment_id: int, original: str) -> None:
+    try:
+        thumbs = render(original)
+    except Exception:
+        # not a decode error (render returns {} for those): leave the column NULL
+        # rather than recording "not an image" for good
+        logger.exception("thumbnails failed for attachment %s", attachment_id)
+        return
+    with Session(engine) as session:
+        att = session.get(TaskAttachment, attachment_id)
+        if att is None:
+            return
+        att.thumbnails = thumbs
+        session.add(att)
+        session.commit()
+
+
+def schedule(attachment_id: int, original: str) -> Optional[Future]:
+    """Queue thumbnail generation for a committed attachment."""
+    global _pool
+    if WORKERS <= 0:
+        return None
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="thumbnails")
+    return _pool.submit(_generate, attachment_id, original)
+
+
+def shutdown() -> None:
+    """Finish the queued thumbnails (called from the app lifespan)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
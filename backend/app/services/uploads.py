@@ -0,0 +1,171 @@
+"""
+Attachment storage. Uploads are copied to disk in CHUNK_SIZE pieces on a worker
+thread, hashed while they stream, and stored under their SHA-256:
+
+    uploads/<sha[:2]>/<sha><ext>
+
+so the same content is stored once however many tasks or names it is attached
+under, and two different files with the same name never overwrite each other.
+The extension is kept only so the static mount can guess the content type.
+
+Since a content-addressed file never changes, UploadFiles (the /uploads mount)
+serves it with `Cache-Control: immutable` and its hash as a strong ETag.
+Records store the relative URL (`public_url`), not one tied to the API host.
+
+Starlette spools the whole multipart body before the handler runs, so the
+size limit is also enforced on the request itself by UploadLimit: an
+oversized Content-Length is refused before anything is read, and a body
+without one is cut off as soon as it streams past the limit.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi import HTTPException, UploadFile
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, JSONResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+UPLOAD_DIR = Path("uploads")
+MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+CHUNK_SIZE = 1024 * 1024
+FORM_OVERHEAD = 64 * 1024  # multipart boundaries and part headers around the file
+URL_PREFIX = "/uploads"
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+_EXT = re.compile(r"^\.[a-z0-9]{1,10}$")
+# "<sha[:2]>/<sha>[_<thumbnail size>][.<ext>]"
+_HASHED = re.compile(r"^[0-9a-f]{2}/(?P<tag>[0-9a-f]{64}(?:_\d+)?)(?:\.[a-z0-9]{1,10})?$")
+_UPLOAD_ROUTE = re.compile(r"^/api/tasks/\d+/attachments/?$")
+
+
+class UploadTooLarge(Exception):
+    """The upload exceeded MAX_BYTES; nothing was stored."""
+
+
+@dataclass(frozen=True)
+class StoredFile:
+    sha256: str
+    size: int
+    path: str  # relative to UPLOAD_DIR, e.g. "ab/ab12…ef.jpg"
+    created: bool  # False when identical content was already stored
+
+
+def too_large_detail(max_bytes: int = MAX_BYTES) -> str:
+    return f"Attachment larger than {max_bytes} bytes"
+
+
+def public_url(path: str) -> str:
+    """Relative URL of a stored file (path relative to UPLOAD_DIR)."""
+    return f"{URL_PREFIX}/{path}"
+
+
+def _extension(filename: str) -> str:
+    ext = Path(filename or "").suffix.lower()
+    return ext if _EXT.match(ext) else ""
+
+
+def _commit(tmp: str, dest: Path) -> bool:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if dest.exists():
+        os.unlink(tmp)
+        return False
+    os.chmod(tmp, 0o644)  # mkstemp creates 0600
+    os.replace(tmp, dest)
+    return True
+
+
+async def store(file: UploadFile, max_bytes: int = MAX_BYTES) -> StoredFile:
+    """Stream `file` to disk and store it content-addressed. Raises UploadTooLarge."""
+    UPLOAD_DIR.mkdir(exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=UPLOAD_DIR, prefix=".upload-")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                digest.update(chunk)
+                await asyncio.to_thread(out.write, chunk)
+        sha = digest.hexdigest()
+        rel = f"{sha[:2]}/{sha}{_extension(file.filename)}"
+        created = await asyncio.to_thread(_commit, tmp, UPLOAD_DIR / rel)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return StoredFile(sha256=sha, size=size, path=rel, created=created)
+
+
+class UploadFiles(StaticFiles):
+    """
+    StaticFiles for UPLOAD_DIR. Content-addressed files get a strong ETag (their
+    hash) and a year of immutable caching; files uploaded before hashing keep
+    the stat-based ETag and must be revalidated. Range requests and `pathsend`
+    (zero-copy, where the server supports it) come from FileResponse.
+    """
+
+    def file_response(
+        self,
+        full_path: os.PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        hashed = _HASHED.match(self.get_path(scope).replace(os.sep, "/"))
+        if hashed:
+            response.headers["etag"] = f'"{hashed["tag"]}"'
+            response.headers["cache-control"] = IMMUTABLE
+        else:
+            response.headers["cache-control"] = "no-cache"
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+class UploadLimit:
+    """
+    ASGI middleware: 413 for an attachment upload whose body is larger than
+    MAX_BYTES plus FORM_OVERHEAD, decided while the request streams instead
+    of after Starlette has spooled all of it.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int = MAX_BYTES) -> None:
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or not _UPLOAD_ROUTE.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        limit = self.max_bytes + FORM_OVERHEAD
+        length = Headers(scope=scope).get("content-length", "")
+        if length.isdigit() and int(length) > limit:
+            # the multipart body is at least as large as the file
+            await JSONResponse({"detail": too_large_detail(self.max_bytes)}, 413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # raised inside the form parser; FastAPI re-raises HTTPException as-is
+                    raise HTTPException(413, too_large_detail(self.max_bytes))
+            return message
+
+        await self.app(scope, limited, send)
@@ -0,0 +1,122 @@
+"""
+Consumption rates and days-to-stockout per stock row.
+
+Usage movements are rolled up per (stock row, day) into StockUsageDaily with
+one INSERT … SELECT … GROUP BY, so the report aggregates a few rows per stock
+row in the database instead of walking the movement log in Python. `refresh()`
+re-aggregates only the days since the last refresh (plus REFRESH_OVERLAP, for
+movements committed late). The whole history is rolled up once, at startup
+(`seed()`), so the report never does the first build.
+"""
+from __future__ import annotations
+
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+import sqlalchemy as sa
+from sqlmodel import Session, select
+
+from ..db import dialect_insert
+from ..models import InventoryItem, InventoryStock, MovementReason, StockMovement, StockUsageDaily, StockUsageState
+
+MAX_AGE = timedelta(seconds=int(os.getenv("USAGE_ROLLUP_MAX_AGE", "60")))
+REFRESH_OVERLAP = timedelta(hours=1)
+
+
+def _utc(dt: datetime) -> datetime:
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _daily_usage(since: Optional[date]):
+    day = sa.func.date(StockMovement.created_at)
+    stmt = (
+        select(StockMovement.stock_id, day, sa.func.sum(-StockMovement.delta_qty))
+        .where(StockMovement.reason == MovementReason.usage)
+        .group_by(StockMovement.stock_id, day)
+    )
+    if since is not None:
+        stmt = stmt.where(StockMovement.created_at >= datetime(since.year, since.month, since.day, tzinfo=timezone.utc))
+    return stmt
+
+
+def _create_state(session: Session) -> bool:
+    # as_of = the epoch: nothing rolled up yet. ON CONFLICT DO NOTHING, so
+    # concurrent first refreshes cannot both insert the row
+    stmt = dialect_insert(session, StockUsageState).values(id=1, as_of=datetime(1970, 1, 1, tzinfo=timezone.utc))
+    return session.exec(stmt.on_conflict_do_nothing(index_elements=["id"])).rowcount == 1
+
+
+def seed(session: Session) -> bool:
+    """Roll up the movement history if it never was (startup); True if it did. The caller commits."""
+    if session.exec(select(StockUsageState.id)).first() is not None:
+        return False
+    refresh(session)
+    return True
+
+
+def refresh(session: Session, now: Optional[datetime] = None) -> None:
+    """Bring StockUsageDaily up to `now`, rewriting only the days that can have changed."""
+    now = now or datetime.now(timezone.utc)
+    created = _create_state(session)
+    state = session.exec(select(StockUsageState).with_for_update()).one()
+    since = None if created else (_utc(state.as_of) - REFRESH_OVERLAP).date()
+
+    clear = sa.delete(StockUsageDaily)
+    if since is not None:
+        clear = clear.where(StockUsageDaily.day >= since)
+    session.exec(clear)
+    session.exec(sa.insert(StockUsageDaily).from_select(["stock_id", "day", "used"], _daily_usage(since)))
+
+    state.as_of = now
+    session.add(state)
+
+
+def ensure_fresh(session: Session, max_age: timedelta = MAX_AGE) -> None:
+    """Refresh the rollup if it is older than `max_age` (or was never seeded)."""
+    now = datetime.now(timezone.utc)
+    state = session.exec(select(StockUsageState)).first()
+    if state is not None and now - _utc(state.as_of) < max_age:
+        return
+    refresh(session, now)
+    session.commit()
+
+
+def stockout_report(today: date, window_days: int, site_id: Optional[int] = None):
+    """
+    Select of one row per stock row: quantity, effective min level, units used and
+    daily rate over the trailing `window_days`, and days until the quantity reaches
+    the min level at that rate (0 if already there, NULL if nothing was used).
+    Soonest first.
+    """
+    start = today - timedelta(days=window_days - 1)
+    # per stock row: a range read on the (stock_id, day) primary key
+    used = (
+        select(sa.func.coalesce(sa.func.sum(StockUsageDaily.used), 0))
+        .where(StockUsageDaily.stock_id == InventoryStock.id, StockUsageDaily.day >= start)
+        .scalar_subquery()
+    )
+    base = (
+        select(
+            InventoryStock.id.label("stock_id"),
+            InventoryStock.site_id,
+            InventoryStock.item_id,
+            InventoryItem.sku,
+            InventoryItem.name,
+            sa.func.coalesce(InventoryStock.quantity, 0).label("quantity"),
+            sa.func.coalesce(InventoryStock.min_level_override, InventoryItem.min_level_default).label("min_level"),
+            used.label("used"),
+        )
+        .join(InventoryItem, InventoryItem.id == InventoryStock.item_id)
+    )
+    if site_id is not None:
+        base = base.where(InventoryStock.site_id == site_id)
+    base = base.subquery()
+
+    rate = sa.cast(base.c.used, sa.Float) / window_days
+    days = sa.case(
+        (base.c.quantity <= base.c.min_level, 0.0),
+        (base.c.used > 0, sa.cast(base.c.quantity - base.c.min_level, sa.Float) / rate),
+        else_=None,
+    )
+    return select(*base.c, rate, days).order_by(days.is_(None), days, base.c.stock_id)
@@ -6,6 +6,7 @@ import {
   deleteAttachment,
   type TaskAttachment,
 } from "../services/task_io";
+import { apiFileUrl } from "../lib/api";
 
 import { Button } from "./ui/button";
 
@@ -137,9 +138,19 @@ export default function TaskAttachments({ taskId }: Props) {
             key={att.id}
             className="flex items-center justify-between gap-3 rounded-lg border border-slate-200 bg-slate-50 px-3 py-2 text-sm"
           >
-            <div className="min-w-0">
+            {att.thumbnails?.["160"] && (
+              <a href={apiFileUrl(att.url)} target="_blank" rel="noreferrer">
+                <img
+                  src={apiFileUrl(att.thumbnails["160"])}
+                  alt={att.filename}
+                  loading="lazy"
+                  className="h-12 w-12 shrink-0 rounded object-cover"
+                />
+              </a>
+            )}
+            <div className="min-w-0 flex-1">
               <a
-                href={att.url}
+                href={apiFileUrl(att.url)}
                 target="_blank"
                 rel="noreferrer"
                 className="truncate text-sky-700 hover:underline"
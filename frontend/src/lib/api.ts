@@ -56,4 +56,9 @@ async function del<T = void>(
 
 const api = { get, post, put, patch, delete: del };
 
+// absolute URL for a file the API serves outside /api (e.g. "/uploads/…")
+export function apiFileUrl(path: string): string {
+  return new URL(path, new URL(BASE_URL, window.location.origin)).toString();
+}
+
 export default api;
@@ -14,6 +14,10 @@ export type TaskAttachment = {
   task_id: number;
   filename: string;
   url: string;
+  size?: number | null;
+  content_type?: string | null;
+  // longest edge in px -> preview url; null while pending, {} if not an image
+  thumbnails?: Record<string, string> | null;
   uploaded_at: string;
 };
 